@@ -0,0 +1,163 @@
+"""
+Cache shared by every worker process on one machine, stored in a SQLite file. No server needed.
+
+LocMemCache gives each worker its own copy: every worker warms separately and an invalidation done
+by one worker (housing.signals) never reaches the others. SQLiteCache keeps one table in a WAL-mode
+SQLite file, so all processes see the same entries, and reads never wait for writers.
+Stampede protection for expensive entries lives in housing.querycache.get_or_recompute.
+
+    CACHES = {"default": {
+        "BACKEND": "bambilimeta.cache.SQLiteCache",
+        "LOCATION": BASE_DIR / "cache.sqlite3",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }}
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._local = threading.local()
+
+    def _connection(self):
+        """One connection per thread and per process (a forked worker must not reuse its parent's)."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)  # Absolute timestamp, or None for "never".
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _write(self, sql, params):
+        """Run one write in an IMMEDIATE transaction, culling now and then to respect MAX_ENTRIES."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = connection.execute(sql, params)
+            if self._cull_frequency and random.random() < 1 / self._cull_frequency:
+                self._cull(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def _cull(self, connection):
+        connection.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        (count,) = connection.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self._max_entries:
+            # Drop the entries closest to expiring (no expiry counts as last).
+            connection.execute(
+                "DELETE FROM cache WHERE key IN ("
+                "SELECT key FROM cache ORDER BY expires IS NULL, expires LIMIT ?)",
+                (count - self._max_entries,),
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(key, version=version): key for key in keys}
+        if not keys:
+            return {}
+        found = {}
+        names = list(keys)
+        for start in range(0, len(names), 500):  # SQLite limits the number of parameters.
+            chunk = names[start:start + 500]
+            rows = self._connection().execute(
+                f"SELECT key, value FROM cache WHERE key IN ({','.join('?' * len(chunk))}) "
+                "AND (expires IS NULL OR expires > ?)",
+                (*chunk, time.time()),
+            )
+            found.update((keys[key], pickle.loads(value)) for key, value in rows)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, self._dumps(value), self._expires(timeout)),
+        )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        # Take over the row only if it is missing or expired, in one statement.
+        return bool(self._write(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, self._dumps(value), self._expires(timeout), time.time()),
+        ))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write(
+            "UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), key, time.time()),
+        ))
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")  # Read-modify-write under the write lock, atomic across processes.
+        try:
+            row = connection.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute("UPDATE cache SET value = ? WHERE key = ?", (self._dumps(value), key))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return bool(self._write("DELETE FROM cache WHERE key = ?", (key,)))
+
+    def delete_many(self, keys, version=None):
+        names = [self.make_and_validate_key(key, version=version) for key in keys]
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            self._write(f"DELETE FROM cache WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)", (key, time.time())
+        ).fetchone() is not None
+
+    def clear(self):
+        self._write("DELETE FROM cache", ())
+
+    def close(self, **kwargs):
+        """Connections are reused for the life of the thread, like LocMemCache keeps its dict."""
@@ -0,0 +1,84 @@
+"""
+Session engine backed by the shared cache, written through to the database only when it matters.
+
+Django's cached_db engine writes the database on every modified request. This one keeps the
+cache always up to date but, on SQLite where every write serializes, skips what it can:
+
+- a save that changes nothing (a key set to the value it already had, a message added and
+  consumed in the same request) is dropped, neither cache nor database is written;
+- keys listed in SESSION_COALESCED_KEYS (bookkeeping such as the welcome flag of
+  housing.mixins, or a last-activity timestamp) are written to the cache at once but reach the
+  database at most once per SESSION_COALESCE_INTERVAL seconds, together with the next write;
+- a session holding nothing but such keys (e.g. an anonymous visitor who has been welcomed) is
+  not written to the database at all until that interval has passed.
+
+Everything else (login, a cart...) is written through immediately, as with cached_db. Losing the
+cache therefore loses at most an interval of coalesced bookkeeping, never a login.
+
+    SESSION_ENGINE = "bambilimeta.sessions"
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+COALESCED_KEYS = frozenset(getattr(settings, "SESSION_COALESCED_KEYS", ()))
+COALESCE_INTERVAL = getattr(settings, "SESSION_COALESCE_INTERVAL", 5 * 60)
+
+
+def _digest(data):
+    return hashlib.md5(json.dumps(data, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = "bambilimeta.sessions"
+
+    @property
+    def _written_key(self):
+        """Cache entry describing the database copy: (durable digest, coalesced digest, written at, in db)."""
+        return f"{self.cache_key}:written"
+
+    def _split(self, data):
+        """Digests of the durable part and of the coalesced part of data."""
+        durable = {key: value for key, value in data.items() if key not in COALESCED_KEYS}
+        coalesced = {key: value for key, value in data.items() if key in COALESCED_KEYS}
+        return _digest(durable), _digest(coalesced)
+
+    def load(self):
+        data = super().load()
+        self._loaded_digest = _digest(data)
+        return data
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if not must_create and _digest(data) == getattr(self, "_loaded_digest", None):
+            return  # Modified, but back to what was loaded.
+
+        durable, coalesced = self._split(data)
+        now = time.time()
+        written = self._cache.get(self._written_key)
+        if written is None:
+            if must_create:  # New session, nothing in the database yet.
+                written = (_digest({}), coalesced, now, False)
+            else:  # Unknown, the entry was evicted: write everything out.
+                written = (None, None, 0, DBStore.exists(self, self.session_key))
+        written_durable, written_coalesced, written_at, in_db = written
+
+        if durable != written_durable or (coalesced != written_coalesced and now - written_at >= COALESCE_INTERVAL):
+            super().save(must_create=must_create or not in_db)  # Database, then cache.
+            written = (durable, coalesced, now, True)
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+        self._cache.set(self._written_key, written, self.get_expiry_age())
+        self._loaded_digest = _digest(data)
+
+    def delete(self, session_key=None):
+        key = session_key or self.session_key
+        super().delete(session_key)
+        if key is not None:
+            self._cache.delete(f"{self.cache_key_prefix}{key}:written")
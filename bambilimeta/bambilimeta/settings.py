@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import sys
+import tempfile
 from pathlib import Path
 import os
 import logging
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     "housing.apps.HousingConfig",
     "marketplace.apps.MarketplaceConfig",
     "users.apps.GeneralAuthConfig",
+    "tasks.apps.TasksConfig",
     "debug_toolbar",
     "phonenumber_field",
     "widget_tweaks",
@@ -202,9 +204,46 @@ INTERNAL_IPS = [
 LOGIN_URL = "auth:login"
 LOGIN_REDIRECT_URL = 'housing:house-list'
 
+# request.user is loaded with its profile and cached (users.backends). ModelBackend stays listed so
+# sessions started before the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    "users.backends.ProfileModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+# Sessions live in the cache and are written through to the database only when something durable
+# changes (bambilimeta.sessions). The keys below are bookkeeping, flushed at most every 5 minutes.
+SESSION_ENGINE = "bambilimeta.sessions"
+SESSION_COALESCED_KEYS = ["welcomed"]
+SESSION_COALESCE_INTERVAL = 5 * 60
+
+# Background tasks (tasks.queue), run by ``manage.py worker``. Failed tasks are retried after
+# 10s, 20s, 40s... at most an hour; a task running for more than 10 minutes is presumed lost.
+TASKS_RETRY_BASE = 10
+TASKS_RETRY_MAX = 60 * 60
+TASKS_LOCK_TIMEOUT = 10 * 60
+
+# List page caches are filled when a web worker boots and refreshed by the task worker this many
+# seconds before they expire (housing.warmup).
+CACHE_WARM_ON_BOOT = True
+CACHE_WARM_MARGIN = 3 * 60
+
+# Chunked, resumable uploads of house videos and images (housing.uploads). Unfinished uploads are
+# deleted after a day without a chunk.
+HOUSE_UPLOAD_CHUNK_SIZE = 1024 * 1024
+HOUSE_VIDEO_MAX_SIZE = 500 * 1024 * 1024
+HOUSE_IMAGE_MAX_SIZE = 20 * 1024 * 1024
+HOUSE_UPLOAD_EXPIRY = 60 * 60 * 24
+
+# One SQLite file shared by every worker process, so cache invalidation reaches all of them.
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
+        "BACKEND": "bambilimeta.cache.SQLiteCache",
+        # Tests clear the cache, so they get their own file (one per run) instead of the real one.
+        "LOCATION": (
+            Path(tempfile.gettempdir()) / f"bambilimeta-test-cache-{os.getpid()}.sqlite3"
+            if TESTING else BASE_DIR / "cache.sqlite3"
+        ),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
     }
 }
@@ -9,8 +9,14 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bambilimeta.settings')
 
 application = get_wsgi_application()
+
+if getattr(settings, "CACHE_WARM_ON_BOOT", True):
+    # Before the first request: URL resolvers, templates and the list pages' cached queries (housing.warmup).
+    from housing.warmup import warm_up
+    warm_up()
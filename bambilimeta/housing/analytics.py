@@ -0,0 +1,116 @@
+"""
+Listing analytics: the append-only ViewLog plus hourly and daily HouseViewRollup rows.
+
+housing.counters hands every flushed batch of views to log_views, which does two things:
+1. bulk-inserts the raw events into ViewLog,
+2. adds the same events to the hour/day rollups (one bulk INSERT of the missing rows + a few grouped UPDATEs).
+Reports only read the rollups, one row per house per bucket, so the size of ViewLog never
+affects them. prune_view_logs (run daily with ``manage.py prune_view_logs``) deletes raw events
+older than the retention window; the rollups are kept.
+"""
+import datetime
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import HouseViewRollup, ViewLog
+
+VIEW_LOG_RETENTION_DAYS = getattr(settings, "VIEW_LOG_RETENTION_DAYS", 90)
+
+
+def hour_bucket(timestamp):
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(timestamp):
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def log_views(events):
+    """
+    Store a batch of views.
+    :param events: Iterable of (house_id, user_id, ip_address, timestamp) tuples.
+    :return: Number of events written.
+    """
+    events = list(events)
+    if not events:
+        return 0
+
+    deltas = Counter()
+    for house_id, _, _, timestamp in events:
+        deltas[(house_id, HouseViewRollup.HOUR, hour_bucket(timestamp))] += 1
+        deltas[(house_id, HouseViewRollup.DAY, day_bucket(timestamp))] += 1
+
+    with transaction.atomic():
+        ViewLog.objects.bulk_create(
+            [ViewLog(house_id=house_id, user_id=user_id, ip_address=ip_address, timestamp=timestamp)
+             for house_id, user_id, ip_address, timestamp in events],
+            batch_size=500,
+        )
+        _add_to_rollups(deltas)
+    return len(events)
+
+
+def _add_to_rollups(deltas):
+    """
+    Add view counts to their rollup rows, creating the missing ones.
+    Missing rows are inserted empty with ignore_conflicts first and every count is then added with
+    an UPDATE, so two flushes creating the same row at once both count, neither fails.
+    :param deltas: Counter of (house_id, period, bucket) -> views.
+    """
+    HouseViewRollup.objects.bulk_create(
+        [HouseViewRollup(house_id=house_id, period=period, bucket=bucket, views=0)
+         for house_id, period, bucket in deltas],
+        batch_size=500, ignore_conflicts=True,
+    )
+    rows = HouseViewRollup.objects.filter(
+        house_id__in={house_id for house_id, _, _ in deltas},
+        bucket__in={bucket for _, _, bucket in deltas},
+    ).values_list("pk", "house_id", "period", "bucket")
+
+    # Rows that get the same number of extra views share one UPDATE.
+    pks_by_delta = defaultdict(list)
+    for pk, house_id, period, bucket in rows:
+        key = (house_id, period, bucket)
+        if key in deltas:
+            pks_by_delta[deltas[key]].append(pk)
+    for delta, pks in pks_by_delta.items():
+        HouseViewRollup.objects.filter(pk__in=pks).update(views=F("views") + delta)
+
+
+def prune_view_logs(days=VIEW_LOG_RETENTION_DAYS):
+    """
+    Delete raw view events older than the retention window. Rollups are not touched.
+    :return: Number of deleted events.
+    """
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = ViewLog.objects.filter(timestamp__lt=cutoff).delete()
+    return deleted
+
+
+def house_views(house_id, period=HouseViewRollup.DAY, since=None):
+    """
+    Views of one house per hour or day, read from the rollups only.
+    :param house_id: Primary key of the house.
+    :param period: HouseViewRollup.HOUR or HouseViewRollup.DAY.
+    :param since: Optional datetime, only buckets starting at or after it.
+    :return: List of (bucket, views), oldest first. Buckets without views are missing.
+    """
+    rollups = HouseViewRollup.objects.filter(house_id=house_id, period=period)
+    if since is not None:
+        rollups = rollups.filter(bucket__gte=since)
+    return list(rollups.order_by("bucket").values_list("bucket", "views"))
+
+
+def total_views_since(house_ids, since):
+    """
+    Daily-rollup view totals for several houses at once.
+    :return: Dict of house_id -> views since the start of since's day.
+    """
+    rows = HouseViewRollup.objects.filter(
+        house_id__in=house_ids, period=HouseViewRollup.DAY, bucket__gte=day_bucket(since)
+    ).values("house_id").annotate(views=Sum("views")).values_list("house_id", "views")
+    return dict(rows)
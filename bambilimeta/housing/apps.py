@@ -7,4 +7,3 @@ class HousingConfig(AppConfig):
 
     def ready(self):
         import housing.signals # This ensures the signal is registered and loaded early.
-
@@ -0,0 +1,187 @@
+"""
+Precomputed map clusters for the house map.
+
+The world is cut into a Web-Mercator grid per zoom level: every map tile (256 px) holds
+CELLS_PER_TILE x CELLS_PER_TILE cells, so one cell is 64 px wide on screen at its zoom.
+HouseMapCluster keeps one row per non-empty cell with the number of houses, their price range
+and centroid. When a house moves, changes price, appears or goes, housing.signals queues the
+recount of only the cells it left and entered (a task of housing.tasks, off the request path), and
+map_clusters_for_viewport picks a zoom at which the viewport spans at most MAX_MARKERS cells,
+so the JSON payload stays bounded no matter how many listings exist.
+"""
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min
+
+from .models import House, HouseMapCluster
+
+CELLS_PER_TILE = 4
+MAX_CLUSTER_ZOOM = 16  # Beyond this, individual houses are returned instead of clusters.
+MAX_MARKERS = 300
+MAX_LATITUDE = 85.05112878  # Web-Mercator cannot show the poles.
+
+
+def cells_per_axis(zoom):
+    return (2 ** zoom) * CELLS_PER_TILE
+
+
+def _lng_of(column, n):
+    return column / n * 360.0 - 180.0
+
+
+def _lat_of(row, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+
+def cell_for(lat, lng, zoom):
+    """
+    (x, y) grid cell of a point at a zoom level. y grows southwards, like map tiles.
+    The cell is the one whose cell_bounds contain the point, the same test refresh_cells runs in SQL.
+    """
+    n = cells_per_axis(zoom)
+    # The Mercator formula gives the cell up to float rounding on its edges...
+    x = min(max(int((lng + 180.0) / 360.0 * n), 0), n - 1)
+    lat_rad = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, lat)))
+    y = min(max(int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n), 0), n - 1)
+    # ...which the comparisons against the bounds themselves settle.
+    while x > 0 and lng < _lng_of(x, n):
+        x -= 1
+    while x < n - 1 and lng >= _lng_of(x + 1, n):
+        x += 1
+    while y > 0 and lat >= _lat_of(y, n):
+        y -= 1
+    while y < n - 1 and lat < _lat_of(y + 1, n):
+        y += 1
+    return x, y
+
+
+def cell_bounds(x, y, zoom):
+    """
+    (south, north, west, east) in degrees of a grid cell, a half-open range: south <= lat < north
+    and west <= lng < east. None on the outer rows and columns, which take everything beyond them
+    (e.g. latitudes past MAX_LATITUDE, or longitude 180).
+    """
+    n = cells_per_axis(zoom)
+    return (
+        _lat_of(y + 1, n) if y < n - 1 else None,
+        _lat_of(y, n) if y > 0 else None,
+        _lng_of(x, n) if x > 0 else None,
+        _lng_of(x + 1, n) if x < n - 1 else None,
+    )
+
+
+def cell_filter(x, y, zoom):
+    """Lookups selecting the houses of a cell, exactly those cell_for puts in it."""
+    south, north, west, east = cell_bounds(x, y, zoom)
+    lookups = {"latitude__isnull": False, "longitude__isnull": False}
+    for lookup, bound in (("latitude__gte", south), ("latitude__lt", north),
+                          ("longitude__gte", west), ("longitude__lt", east)):
+        if bound is not None:
+            lookups[lookup] = bound
+    return lookups
+
+
+def cells_of(position):
+    """Every (zoom, x, y) cell a (lat, lng) position falls into, one per zoom level."""
+    if position is None or None in position:
+        return set()
+    lat, lng = position
+    return {(zoom, *cell_for(lat, lng, zoom)) for zoom in range(MAX_CLUSTER_ZOOM + 1)}
+
+
+def refresh_cells(cells):
+    """
+    Recompute the given cells from the House table. Each cell is one indexed range aggregate
+    on (latitude, longitude), over the same half-open bounds cell_for assigns houses by, so a
+    house on a cell edge is counted in exactly one cell. Empty cells are deleted.
+    :param cells: Iterable of (zoom, x, y).
+    """
+    with transaction.atomic():
+        for zoom, x, y in cells:
+            stats = House.objects.filter(**cell_filter(x, y, zoom)).aggregate(
+                count=Count("pk"), min_price=Min("price"), max_price=Max("price"),
+                latitude=Avg("latitude"), longitude=Avg("longitude"), house_id=Min("pk"),
+            )
+            if not stats["count"]:
+                HouseMapCluster.objects.filter(zoom=zoom, x=x, y=y).delete()
+                continue
+            if stats["count"] > 1:
+                stats["house_id"] = None  # Only single-house markers link straight to a listing.
+            HouseMapCluster.objects.update_or_create(zoom=zoom, x=x, y=y, defaults=stats)
+
+
+def rebuild_clusters():
+    """
+    Rebuild every cluster from scratch: one pass over the houses with coordinates,
+    grouped in Python for all zoom levels, then a single bulk insert.
+    :return: Number of cluster rows written.
+    """
+    buckets = defaultdict(list)
+    for pk, lat, lng, price in House.objects.filter(
+        latitude__isnull=False, longitude__isnull=False
+    ).values_list("pk", "latitude", "longitude", "price").iterator():
+        for zoom in range(MAX_CLUSTER_ZOOM + 1):
+            buckets[(zoom, *cell_for(lat, lng, zoom))].append((pk, lat, lng, price))
+
+    clusters = []
+    for (zoom, x, y), houses in buckets.items():
+        prices = [price for _, _, _, price in houses]
+        clusters.append(HouseMapCluster(
+            zoom=zoom, x=x, y=y, count=len(houses),
+            min_price=min(prices), max_price=max(prices),
+            latitude=sum(lat for _, lat, _, _ in houses) / len(houses),
+            longitude=sum(lng for _, _, lng, _ in houses) / len(houses),
+            house_id=houses[0][0] if len(houses) == 1 else None,
+        ))
+
+    with transaction.atomic():
+        HouseMapCluster.objects.all().delete()
+        HouseMapCluster.objects.bulk_create(clusters, batch_size=500)
+    return len(clusters)
+
+
+def zoom_for_viewport(zoom, south, west, north, east):
+    """
+    Highest zoom <= the requested one at which the viewport covers at most MAX_MARKERS cells.
+    Zooming out by one halves the cells per axis, so this converges in a few steps without a query.
+    """
+    zoom = min(zoom, MAX_CLUSTER_ZOOM)
+    while zoom > 0:
+        x0, y0 = cell_for(north, west, zoom)
+        x1, y1 = cell_for(south, east, zoom)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= MAX_MARKERS:
+            break
+        zoom -= 1
+    return zoom
+
+
+def map_clusters_for_viewport(zoom, south, west, north, east):
+    """
+    Markers for a map viewport.
+    :param zoom: Map zoom level requested by the client.
+    :param south, west, north, east: Viewport bounds in degrees (west <= east, no antimeridian wrap).
+    :return: (zoom actually used, list of marker dicts). At most MAX_MARKERS markers.
+    """
+    if zoom > MAX_CLUSTER_ZOOM:
+        houses = House.objects.filter(
+            latitude__gte=south, latitude__lte=north, longitude__gte=west, longitude__lte=east
+        ).values("pk", "latitude", "longitude", "price")[:MAX_MARKERS]
+        return zoom, [
+            {"lat": h["latitude"], "lng": h["longitude"], "count": 1,
+             "min_price": float(h["price"]), "max_price": float(h["price"]), "house_id": h["pk"]}
+            for h in houses
+        ]
+
+    zoom = zoom_for_viewport(zoom, south, west, north, east)
+    x0, y0 = cell_for(north, west, zoom)
+    x1, y1 = cell_for(south, east, zoom)
+    clusters = HouseMapCluster.objects.filter(
+        zoom=zoom, x__gte=x0, x__lte=x1, y__gte=y0, y__lte=y1
+    ).values("latitude", "longitude", "count", "min_price", "max_price", "house_id")[:MAX_MARKERS]
+    return zoom, [
+        {"lat": c["latitude"], "lng": c["longitude"], "count": c["count"],
+         "min_price": float(c["min_price"]), "max_price": float(c["max_price"]), "house_id": c["house_id"]}
+        for c in clusters
+    ]
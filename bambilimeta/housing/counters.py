@@ -0,0 +1,138 @@
+"""
+Write-behind view counter for houses.
+
+A detail page hit used to run ``UPDATE housing_house SET view_count = view_count + 1`` right away,
+turning every read into a write on SQLite, which serializes writers. Instead, record_view only
+appends the view to a buffer in the cache; flush_view_counts later applies all buffered views
+with batched UPDATEs (view_count, then trending_score) and hands them to housing.analytics (ViewLog + rollups).
+
+The buffer lives in the cache (not in the worker), so it survives a worker restart and every
+process sharing the cache feeds the same buffer. It is split into generations:
+
+- ``house_views:gen`` is the generation new views go to, ``house_views:flushed`` the last one
+  applied. Both are kept without expiry, and should the cache still lose ``gen``, it restarts
+  right after ``flushed``: a generation number is never handed out again below the pointer.
+- ``house_views:<gen>:n`` counts the views of a generation, ``house_views:<gen>:event:<i>`` holds
+  the i-th one as (house_id, user_id, ip_address, timestamp).
+- A flush rotates to a new generation and applies the ones that are at least one interval old,
+  so no worker is still writing into what is being flushed. The flush is a periodic task of
+  housing.tasks run by ``manage.py worker`` every interval, never a request. Nothing is flushed
+  on shutdown: the buffer outlives the process, the next flush of any process applies it.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import trending
+from .analytics import log_views
+from .models import House
+
+FLUSH_INTERVAL = getattr(settings, "HOUSE_VIEW_FLUSH_INTERVAL", 30)  # Seconds between batched UPDATEs.
+BUFFER_TTL = 60 * 60 * 24  # Orphaned buffer keys expire after a day.
+RETRY_GENERATIONS = 10  # How far behind the flushed pointer a released generation is still found.
+PREFIX = "house_views"
+
+
+def _current_generation():
+    generation = cache.get(f"{PREFIX}:gen")
+    if generation is None:
+        cache.add(f"{PREFIX}:gen", last_flushed_generation() + 1, None)
+        generation = cache.get(f"{PREFIX}:gen", last_flushed_generation() + 1)
+    return generation
+
+
+def record_view(house_id, user_id=None, ip_address=None):
+    """
+    Count one view of a house. Only touches the cache, the database is updated by the next flush.
+    :param house_id: Primary key of the viewed house.
+    :param user_id: Primary key of the viewer, None for anonymous visitors.
+    :param ip_address: The viewer's IP address, if known.
+    """
+    generation = _current_generation()
+    index = _incr(f"{PREFIX}:{generation}:n")
+    cache.set(
+        f"{PREFIX}:{generation}:event:{index}", (house_id, user_id, ip_address, timezone.now()), BUFFER_TTL
+    )
+
+
+def last_flushed_generation():
+    """Last flushed generation: changes with every flush, so whenever view_count / trending_score may have moved."""
+    return cache.get(f"{PREFIX}:flushed", 0)
+
+
+def _incr(key, initial=1, timeout=BUFFER_TTL):
+    try:
+        return cache.incr(key)
+    except ValueError:  # Key expired or was never set.
+        if cache.add(key, initial, timeout):
+            return initial
+        return cache.incr(key)
+
+
+def flush_view_counts():
+    """
+    Apply buffered views to House.view_count and trending_score, for all houses at once, and store them in the ViewLog.
+    Only generations closed by an earlier flush are applied: views still being written to the
+    current or the just-closed generation wait for the next one.
+    The buffer is deleted once the UPDATE has committed. If it fails (e.g. "database is locked"),
+    the claims are released and the exception propagates, so the next flush (the task's retry)
+    applies the same views again.
+    :return: Number of views written.
+    """
+    last_flushed = last_flushed_generation()
+    # Rotate: from now on views go to new_generation. A lost gen counts as last_flushed + 1 being current.
+    new_generation = _incr(f"{PREFIX}:gen", initial=last_flushed + 2, timeout=None)
+    # Leave the generation we just closed for the next flush, a slow request may still be writing to it.
+    upto = new_generation - 2
+
+    # Generations a failed flush released may sit a little behind the pointer, look back for them.
+    generations = range(max(1, last_flushed + 1 - RETRY_GENERATIONS, upto - 1000), upto + 1)
+    done = cache.get_many([f"{PREFIX}:{generation}:claimed" for generation in generations])
+    claimed, keys, events = [], [], []
+    for generation in generations:
+        claim = f"{PREFIX}:{generation}:claimed"
+        if claim in done or not cache.add(claim, 1, BUFFER_TTL):
+            continue  # Flushed already, or another process is flushing this generation.
+        claimed.append(claim)
+        size = cache.get(f"{PREFIX}:{generation}:n", 0)
+        generation_keys = [f"{PREFIX}:{generation}:event:{index}" for index in range(1, size + 1)]
+        events.extend(cache.get_many(generation_keys).values())
+        keys.extend(generation_keys + [f"{PREFIX}:{generation}:n"])
+
+    def discard_buffer():
+        cache.delete_many(keys)
+        if upto > cache.get(f"{PREFIX}:flushed", 0):
+            cache.set(f"{PREFIX}:flushed", upto, None)
+
+    try:
+        if events:
+            _apply_views(events, discard_buffer)
+        else:
+            discard_buffer()
+    except Exception:
+        cache.delete_many(claimed)  # Let the next flush pick these generations up again.
+        raise
+    return len(events)
+
+
+def _apply_views(events, on_commit):
+    counts = Counter()
+    points = {}
+    for house_id, _, _, timestamp in events:
+        counts[house_id] += 1
+        points[house_id] = trending.combine(points.get(house_id), trending.event_points(timestamp))
+    with transaction.atomic():
+        House.objects.filter(pk__in=counts).update(
+            view_count=F("view_count") + Case(
+                *[When(pk=house_id, then=Value(views)) for house_id, views in counts.items()],
+                default=Value(0),
+            ),
+        )
+        trending.add_points(points)
+        existing = set(House.objects.filter(pk__in=counts).values_list("pk", flat=True))
+        log_views(event for event in events if event[0] in existing)  # Skip houses deleted meanwhile.
+        transaction.on_commit(on_commit)
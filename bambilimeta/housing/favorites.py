@@ -0,0 +1,51 @@
+"""
+Per-user set of favorited house IDs, cached so favorite hearts cost no query per card.
+
+Every page that shows house cards calls mark_favorites(houses, user) once. The first call for a
+user loads all their favorited IDs with a single query and caches them, later pages read the cache.
+housing.signals drops the cached set whenever a Favorite row is created or deleted (toggle_favorite,
+admin, cascades), so hearts are never stale.
+"""
+from django.core.cache import cache
+
+from .models import Favorite
+
+FAVORITE_IDS_TIMEOUT = 60 * 60  # An hour. Invalidation is explicit, the timeout only bounds memory.
+
+
+def favorite_ids_cache_key(user_id):
+    return f"favorite_house_ids:{user_id}"
+
+
+def favorite_house_ids(user):
+    """
+    IDs of every house the user has favorited.
+    :param user: request.user, may be anonymous.
+    :return: A frozenset of house primary keys (empty for anonymous users, without touching the DB).
+    """
+    if not getattr(user, "is_authenticated", False):
+        return frozenset()
+    key = favorite_ids_cache_key(user.pk)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Favorite.objects.filter(user_id=user.pk).values_list("house_id", flat=True))
+        cache.set(key, ids, FAVORITE_IDS_TIMEOUT)
+    return ids
+
+
+def invalidate_favorite_house_ids(user_id):
+    """Forget the cached set, the next favorite_house_ids call reloads it."""
+    cache.delete(favorite_ids_cache_key(user_id))
+
+
+def mark_favorites(houses, user):
+    """
+    Set ``is_favorited`` on every house in one step.
+    :param houses: Any iterable of House instances (a page, a list, an evaluated queryset).
+    :param user: request.user.
+    :return: houses, for chaining.
+    """
+    ids = favorite_house_ids(user)
+    for house in houses:
+        house.is_favorited = house.pk in ids
+    return houses
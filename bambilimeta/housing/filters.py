@@ -0,0 +1,140 @@
+"""
+Filtering, sorting and facet counts for the house list.
+
+HouseListView validates the query string with HouseFilterForm (housing.forms) and hands the
+cleaned data to filter_houses / sort_houses. house_facets then counts every facet bucket of the
+resulting queryset with one aggregate query (COUNT(...) FILTER (WHERE ...) per bucket), instead of
+running one COUNT query per facet.
+"""
+from django.db.models import Count, Q
+
+from .geo import DEFAULT_RADIUS_M, houses_within
+
+# (value, label, condition) - value is what the filter form submits.
+BEDROOM_BUCKETS = [
+    (1, "1 bedroom", Q(num_bedrooms=1)),
+    (2, "2 bedrooms", Q(num_bedrooms=2)),
+    (3, "3 bedrooms", Q(num_bedrooms=3)),
+    (4, "4+ bedrooms", Q(num_bedrooms__gte=4)),
+]
+
+PRICE_BUCKETS = [
+    ("0-100", "Under $100", Q(price__lt=100)),
+    ("100-250", "$100 - $250", Q(price__gte=100, price__lt=250)),
+    ("250-500", "$250 - $500", Q(price__gte=250, price__lt=500)),
+    ("500-", "$500 and above", Q(price__gte=500)),
+]
+
+DISTANCE_BUCKETS = [
+    (0.5, "Within 500 m", Q(proximity_to_campus__lte=0.5)),
+    (1, "Within 1 km", Q(proximity_to_campus__lte=1)),
+    (3, "Within 3 km", Q(proximity_to_campus__lte=3)),
+]
+
+AMENITY_FIELDS = [
+    ("furnished", "Furnished"),
+    ("has_wifi", "Wi-Fi"),
+    ("utilities_included", "Utilities included"),
+]
+
+# ?sort= value -> (label, order_by). "-pk" breaks ties so pages never overlap.
+SORT_OPTIONS = {
+    "newest": ("Newest", ("-created_at", "-pk")),
+    "price": ("Price: low to high", ("price", "-pk")),
+    "-price": ("Price: high to low", ("-price", "-pk")),
+    "most_viewed": ("Most viewed", ("-view_count", "-pk")),
+    "trending": ("Trending", ("-trending_score", "-pk")),
+    "best_rated": ("Best rated", ("-rating_average", "-review_count", "-pk")),
+    # Only meaningful with a ?lat=&lng= point, see housing.geo.houses_within.
+    "distance": ("Nearest", ("distance_m", "pk")),
+}
+
+
+def filter_houses(queryset, data):
+    """
+    Apply the cleaned HouseFilterForm data to a House queryset.
+    :param queryset: House queryset to narrow down.
+    :param data: form.cleaned_data. Missing or empty values are ignored.
+    :return: The filtered queryset.
+    """
+    if data.get("min_price") is not None:
+        queryset = queryset.filter(price__gte=data["min_price"])
+    if data.get("max_price") is not None:
+        queryset = queryset.filter(price__lte=data["max_price"])
+    for value, label, condition in PRICE_BUCKETS:
+        if data.get("price_range") == value:
+            queryset = queryset.filter(condition)
+
+    bedrooms = data.get("bedrooms")
+    if bedrooms:
+        conditions = Q()
+        for value, label, condition in BEDROOM_BUCKETS:
+            if value in bedrooms:
+                conditions |= condition
+        queryset = queryset.filter(conditions)
+
+    for field, label in AMENITY_FIELDS:
+        if data.get(field):
+            queryset = queryset.filter(**{field: True})
+
+    if data.get("occupants"):
+        queryset = queryset.filter(max_occupants__gte=data["occupants"])
+    if data.get("max_distance") is not None:
+        queryset = queryset.filter(proximity_to_campus__lte=data["max_distance"])
+    if data.get("lat") is not None and data.get("lng") is not None:
+        queryset = houses_within(queryset, data["lat"], data["lng"], data.get("radius") or DEFAULT_RADIUS_M)
+    return queryset
+
+
+def sort_houses(queryset, sort):
+    """
+    Order a House queryset by one of SORT_OPTIONS. Unknown or empty keys leave the order untouched,
+    so search results keep their relevance ranking unless the user picks a sort.
+    """
+    if sort == "distance" and "distance_m" not in queryset.query.annotations:
+        return queryset  # No point to measure from.
+    if sort in SORT_OPTIONS:
+        return queryset.order_by(*SORT_OPTIONS[sort][1])
+    return queryset
+
+
+def house_facets(queryset):
+    """
+    Count every facet bucket of a House queryset in a single aggregate query.
+
+    Counts describe the given result set (search + active filters), so they show how many houses
+    remain if the user narrows down further.
+    :param queryset: The filtered House queryset (without pagination).
+    :return: dict with total and lists of {"value", "label", "count"} per facet group.
+    """
+    aggregates = {"total": Count("pk")}
+    for value, label, condition in BEDROOM_BUCKETS:
+        aggregates[f"bedrooms_{value}"] = Count("pk", filter=condition)
+    for value, label, condition in PRICE_BUCKETS:
+        aggregates[f"price_{value}"] = Count("pk", filter=condition)
+    for value, label, condition in DISTANCE_BUCKETS:
+        aggregates[f"distance_{value}"] = Count("pk", filter=condition)
+    for field, label in AMENITY_FIELDS:
+        aggregates[field] = Count("pk", filter=Q(**{field: True}))
+
+    counts = queryset.order_by().aggregate(**aggregates)
+
+    return {
+        "total": counts["total"],
+        "bedrooms": [
+            {"value": value, "label": label, "count": counts[f"bedrooms_{value}"]}
+            for value, label, condition in BEDROOM_BUCKETS
+        ],
+        "price": [
+            {"value": value, "label": label, "count": counts[f"price_{value}"]}
+            for value, label, condition in PRICE_BUCKETS
+        ],
+        "distance": [
+            {"value": value, "label": label, "count": counts[f"distance_{value}"]}
+            for value, label, condition in DISTANCE_BUCKETS
+        ],
+        "amenities": [
+            {"value": field, "label": label, "count": counts[field]}
+            for field, label in AMENITY_FIELDS
+        ],
+    }
@@ -1,5 +1,7 @@
 from django import forms
 from .models import House, HouseImage, HouseReview
+from .filters import BEDROOM_BUCKETS, PRICE_BUCKETS, SORT_OPTIONS
+from .geo import MAX_RADIUS_M
 from django.forms import modelformset_factory, FileInput, inlineformset_factory
 
 
@@ -9,7 +11,7 @@ from .models import House, HouseImage
 class HouseForm(forms.ModelForm):
     class Meta:
         model = House
-        fields = ['title', 'location', 'price', 'house_desc', 'video']
+        fields = ['title', 'location', 'latitude', 'longitude', 'price', 'house_desc', 'video']
         widgets = {
             'title': forms.TextInput(attrs={
                 'class': 'form-control',
@@ -19,6 +21,16 @@ class HouseForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'e.g. Bambili, close to main market.'
             }),
+            'latitude': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'step': 'any',
+                'placeholder': 'e.g. 6.0921'
+            }),
+            'longitude': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'step': 'any',
+                'placeholder': 'e.g. 10.2347'
+            }),
             'price': forms.NumberInput(attrs={
                 'class': 'form-control',
                 'placeholder': '$ per Month '
@@ -36,6 +48,8 @@ class HouseForm(forms.ModelForm):
         help_texts = {
             'title': 'Keep it short, descriptive, and unique.',
             'location': 'Where is the property located?',
+            'latitude': 'Optional. Lets students find the house on the map and by distance.',
+            'longitude': 'Optional. Lets students find the house on the map and by distance.',
             'price': 'Set a competitive price per night.',
             'house_desc': 'Highlight amenities, space, and nearby attractions.',
             'video': 'Paste a YouTube or Vimeo link for a video tour.',
@@ -87,3 +101,43 @@ class HouseReviewForm(forms.ModelForm):
     class Meta:
         model = HouseReview
         fields = ["rating", "comment"]
+
+
+class HouseFilterForm(forms.Form):
+    """
+    Validates the filter/sort query string of the house list.
+    Every field is optional, an empty form means "all houses in the default order".
+    """
+    min_price = forms.DecimalField(required=False, min_value=0, decimal_places=2, widget=forms.NumberInput(attrs={
+        'class': 'form-control form-control-sm', 'placeholder': 'Min $'
+    }))
+    max_price = forms.DecimalField(required=False, min_value=0, decimal_places=2, widget=forms.NumberInput(attrs={
+        'class': 'form-control form-control-sm', 'placeholder': 'Max $'
+    }))
+    price_range = forms.ChoiceField(
+        required=False, choices=[("", "Any price")] + [(value, label) for value, label, _ in PRICE_BUCKETS]
+    )
+    bedrooms = forms.TypedMultipleChoiceField(
+        required=False, coerce=int,
+        choices=[(value, label) for value, label, _ in BEDROOM_BUCKETS],
+        widget=forms.CheckboxSelectMultiple,
+    )
+    furnished = forms.BooleanField(required=False)
+    has_wifi = forms.BooleanField(required=False)
+    utilities_included = forms.BooleanField(required=False)
+    occupants = forms.IntegerField(required=False, min_value=1, widget=forms.NumberInput(attrs={
+        'class': 'form-control form-control-sm', 'placeholder': 'Occupants'
+    }))
+    max_distance = forms.FloatField(required=False, min_value=0, widget=forms.NumberInput(attrs={
+        'class': 'form-control form-control-sm', 'placeholder': 'Max km to campus', 'step': '0.1'
+    }))
+    lat = forms.FloatField(required=False, min_value=-90, max_value=90, widget=forms.HiddenInput)
+    lng = forms.FloatField(required=False, min_value=-180, max_value=180, widget=forms.HiddenInput)
+    radius = forms.IntegerField(
+        required=False, min_value=50, max_value=MAX_RADIUS_M, help_text="Search radius in meters",
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm', 'placeholder': 'Radius (m)'})
+    )
+    sort = forms.ChoiceField(
+        required=False, choices=[("", "Best match")] + [(key, label) for key, (label, _) in SORT_OPTIONS.items()],
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
@@ -0,0 +1,72 @@
+"""
+Per-card HTML fragment cache for the house and product lists.
+
+Each listing has a version token in the cache (``card_version:<model>:<pk>``), replaced from
+housing.signals / marketplace.signals whenever the listing, one of its images or its rating
+changes. A card is cached under ``card:<model>:<pk>:<version>``, so a change simply makes the old
+fragment unreachable.
+
+render_cards reads every version and every fragment of a page with two get_many calls, renders
+only the cards that missed (prefetching their images just for them) and stores those with one
+set_many. Anything that depends on the viewer (favorite hearts) or on the request (distance to a
+searched point) must stay outside the card template.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TIMEOUT = 60 * 60 * 24
+
+
+def card_version_key(model, pk):
+    return f"card_version:{model._meta.label_lower}:{pk}"
+
+
+def bump_card_version(model, pk):
+    """Invalidate the cached card of one listing."""
+    cache.set(card_version_key(model, pk), uuid.uuid4().hex, None)
+
+
+def card_versions(objects):
+    """Current version token of every object's card, creating tokens for listings without one."""
+    keys = {obj.pk: card_version_key(type(obj), obj.pk) for obj in objects}
+    found = cache.get_many(keys.values())
+    versions = {}
+    for pk, key in keys.items():
+        if key not in found:
+            # Never bumped, or the token was evicted. A fresh token can never match an old fragment.
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+        versions[pk] = found[key]
+    return versions
+
+
+def render_cards(objects, template_name, name, prefetch=()):
+    """
+    Set ``card_html`` on every object from the fragment cache, rendering only the misses.
+    :param objects: The listings of the page (House or Product instances).
+    :param template_name: Card template, rendered with the object as its only context variable.
+    :param name: Name of that variable in the template, e.g. "house".
+    :param prefetch: Lookups (or Prefetch objects) the card template needs, loaded for the misses only.
+    :return: objects, for chaining.
+    """
+    objects = list(objects)
+    if not objects:
+        return objects
+    versions = card_versions(objects)
+    keys = {obj.pk: f"card:{type(obj)._meta.label_lower}:{obj.pk}:{versions[obj.pk]}" for obj in objects}
+    found = cache.get_many(keys.values())
+
+    missing = [obj for obj in objects if keys[obj.pk] not in found]
+    if missing:
+        prefetch_related_objects(missing, *prefetch)
+        rendered = {keys[obj.pk]: render_to_string(template_name, {name: obj}) for obj in missing}
+        cache.set_many(rendered, CARD_TIMEOUT)
+        found.update(rendered)
+
+    for obj in objects:
+        obj.card_html = mark_safe(found[keys[obj.pk]])
+    return objects
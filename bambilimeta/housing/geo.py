@@ -0,0 +1,68 @@
+"""
+Radius search and distance ordering for houses on plain SQLite (no GIS extension).
+
+1. A bounding box around the point is turned into range filters on the indexed
+   (latitude, longitude) columns, so SQLite only reads the candidate rows.
+2. The exact great-circle (haversine) distance of every candidate is computed by the database,
+   with Django's math functions (which it registers on SQLite builds that lack them).
+3. Houses outside the radius are dropped and the rest are annotated with ``distance_m``, all in
+   the same query, so filtering, ordering and paginating on the distance stay in SQL.
+"""
+import math
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_M = 6_371_000
+DEFAULT_RADIUS_M = 5_000
+MAX_RADIUS_M = 50_000
+
+
+def bounding_box(lat, lng, radius_m):
+    """
+    The smallest lat/lng rectangle that contains the circle of radius_m around (lat, lng).
+    :return: (min_lat, max_lat, min_lng, max_lng) in degrees.
+    """
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    # A degree of longitude shrinks towards the poles. Near them, just take every longitude.
+    cos_lat = math.cos(math.radians(lat))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(180.0, lat_delta / cos_lat)
+    return lat - lat_delta, lat + lat_delta, lng - lng_delta, lng + lng_delta
+
+
+def within_bounding_box(queryset, lat, lng, radius_m):
+    """Cheap index-backed prefilter: houses with coordinates inside the bounding box."""
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_m)
+    return queryset.filter(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    )
+
+
+def distance_expression(lat, lng):
+    """The haversine distance in meters from (lat, lng) to a house's coordinates, as a SQL expression."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lat2 = Radians(F("latitude"))
+    a = (
+        Power(Sin((lat2 - Value(lat1)) / 2), 2)
+        + Value(math.cos(lat1)) * Cos(lat2) * Power(Sin((Radians(F("longitude")) - Value(lng1)) / 2), 2)
+    )
+    # Rounding can push a a hair above 1 for antipodal points, where ASIN has no value.
+    return Value(2 * EARTH_RADIUS_M) * ASin(Sqrt(Least(a, Value(1.0))), output_field=FloatField())
+
+
+def houses_within(queryset, lat, lng, radius_m=DEFAULT_RADIUS_M):
+    """
+    Narrow a House queryset to the houses within radius_m of (lat, lng).
+
+    Houses without coordinates are never returned. The result is annotated with ``distance_m``
+    (exact, in meters), so callers can show it or order_by("distance_m").
+    :param queryset: The House queryset to search in (may already be filtered).
+    :param lat: Latitude of the point in degrees.
+    :param lng: Longitude of the point in degrees.
+    :param radius_m: Search radius in meters.
+    :return: The filtered, annotated queryset.
+    """
+    return within_bounding_box(queryset, lat, lng, radius_m).annotate(
+        distance_m=distance_expression(lat, lng)
+    ).filter(distance_m__lte=radius_m)
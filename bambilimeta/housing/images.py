@@ -0,0 +1,133 @@
+"""
+Background processing of uploaded photos: listings (HouseImage, ProductImage) and avatars (Profile).
+
+Uploads are stored exactly as received and the request returns right away: decoding and resizing
+a multi-megabyte phone photo never happens on the request path. housing.signals / marketplace.signals /
+users.signals queue the upload as a task (tasks.queue) and, once it is committed, ``manage.py worker``
+turns it upright from its EXIF orientation,
+drops its metadata and writes one WebP and one JPEG per width of VARIANT_WIDTHS (never upscaled)
+under ``<upload dir>/variants/``. Their names and sizes are saved in the image's ``variants`` field
+with update_fields=["variants"], so the usual signals refresh the cached cards and ETags.
+
+Templates render photos through housing/_picture.html, which offers the variants as a srcset (the
+browser downloads the smallest one that fits) and falls back to the original until they exist.
+``manage.py process_images`` processes every image without current variants, e.g. older uploads.
+"""
+import os
+
+from django.apps import apps
+from django.conf import settings
+
+from users.thumbnails import FORMATS, encode, open_upright, resized
+
+VARIANT_WIDTHS = getattr(settings, "IMAGE_VARIANT_WIDTHS", (320, 640, 1280))
+IMAGE_MODELS = ("housing.HouseImage", "marketplace.ProductImage", "users.Profile")
+
+
+def variant_prefix(name):
+    """Storage name prefix of an original's variants: house_images/a.jpg -> house_images/variants/a-"""
+    directory, filename = os.path.split(name)
+    return os.path.join(directory, "variants", os.path.splitext(filename)[0]) + "-"
+
+
+def render_variants(root, name, widths=VARIANT_WIDTHS, square=False):
+    """
+    Write the variants of one image. Files only, no database.
+    :param root: Directory the storage keeps its files in (MEDIA_ROOT).
+    :param name: Storage name of the original.
+    :param widths: Target widths, those wider than the original are clamped to it.
+    :param square: Crop to width x width squares (avatars) instead of keeping the aspect ratio.
+    :return: A list of {"name", "format", "width", "height"}, smallest first.
+    """
+    img = open_upright(os.path.join(root, name))
+    prefix = variant_prefix(name)
+    os.makedirs(os.path.dirname(os.path.join(root, prefix)), exist_ok=True)
+    largest = min(img.size) if square else img.width
+    variants = []
+    for width in sorted({min(width, largest) for width in widths}):
+        variant = resized(img, (width, width if square else img.height), crop=square)
+        for format, extension in FORMATS.items():
+            variant_name = f"{prefix}{width}.{extension}"
+            path = os.path.join(root, variant_name)
+            with open(f"{path}.tmp", "wb") as out:
+                out.write(encode(variant, format))
+            os.replace(f"{path}.tmp", path)  # Never serve a half-written file.
+            variants.append({"name": variant_name, "format": extension, "width": variant.width, "height": variant.height})
+    return variants
+
+
+def store_variants(label, pk, name, variants):
+    """Save variants on the image, unless it was deleted or replaced by another upload meanwhile."""
+    image = apps.get_model(label).objects.filter(pk=pk).first()
+    if image is None or image.image.name != name:
+        return
+    image.variants = variants
+    image.save(update_fields=["variants"])
+
+
+def process_image(image):
+    """Render and store the variants of one image, synchronously."""
+    variants = render_variants(
+        image.image.storage.location, image.image.name, image.variant_widths, image.square_variants
+    )
+    store_variants(image._meta.label, image.pk, image.image.name, variants)
+
+
+def queue_image(image):
+    """Process image in a worker, once the current transaction commits."""
+    from .tasks import make_image_variants
+    make_image_variants.delay(image._meta.label, image.pk, image.image.name)
+
+
+class ImageVariantsMixin:
+    """Template helpers for a model with an ``image`` file field and a ``variants`` JSONField."""
+
+    variant_widths = VARIANT_WIDTHS
+    square_variants = False
+
+    @property
+    def variants_ready(self):
+        """False until the pipeline has run, and again after the image is replaced."""
+        return bool(self.image and self.variants) and self.variants[0]["name"].startswith(
+            variant_prefix(self.image.name)
+        )
+
+    def _srcset(self, extension):
+        url = self.image.storage.url
+        return ", ".join(f"{url(v['name'])} {v['width']}w" for v in self.variants if v["format"] == extension)
+
+    @property
+    def webp_srcset(self):
+        return self._srcset("webp")
+
+    @property
+    def jpeg_srcset(self):
+        return self._srcset("jpg")
+
+    def _jpeg_variants(self):
+        return [v for v in self.variants if v["format"] == "jpg"]
+
+    @property
+    def largest_variant(self):
+        return self._jpeg_variants()[-1]
+
+    @property
+    def thumbnail_url(self):
+        """Smallest JPEG variant, for thumbnail strips. The original while there is none."""
+        if not self.variants_ready:
+            return self.image.url
+        return self.image.storage.url(self._jpeg_variants()[0]["name"])
+
+    def variant_url(self, width):
+        """Smallest JPEG variant at least width pixels wide (else the largest), the original while there is none."""
+        if not self.variants_ready:
+            return self.image.url
+        jpegs = self._jpeg_variants()
+        return self.image.storage.url(next((v for v in jpegs if v["width"] >= width), jpegs[-1])["name"])
+
+    @property
+    def display_url(self):
+        """Largest JPEG variant (for browsers without srcset), the original while there is none."""
+        if not self.variants_ready:
+            return self.image.url
+        return self.image.storage.url(self.largest_variant["name"])
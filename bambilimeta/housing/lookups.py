@@ -0,0 +1,17 @@
+from django.db.models import Lookup
+
+
+class FullTextMatch(Lookup):
+    """
+    ``field__match="..."`` compiles to SQLite's ``<column> MATCH %s``.
+
+    Registered on the hidden FTS5 column of HouseSearchIndex (the column that carries the
+    table's own name), so the MATCH runs against every indexed column at once and SQLite
+    answers it from the full-text index instead of scanning housing_house.
+    """
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
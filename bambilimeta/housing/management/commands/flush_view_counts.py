@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from housing.counters import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = "Write buffered house views to House.view_count now, rather than at the worker's next periodic flush."
+
+    def handle(self, *args, **options):
+        written = flush_view_counts()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {written} buffered views."))
@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from housing.images import IMAGE_MODELS, process_image
+
+
+class Command(BaseCommand):
+    help = "Write the resized variants of every house and product image that has none (or stale ones)."
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        for label in IMAGE_MODELS:
+            for image in apps.get_model(label).objects.exclude(image="").exclude(image=None).iterator():
+                if image.variants_ready:
+                    continue
+                try:
+                    process_image(image)
+                    processed += 1
+                except OSError as exc:  # Missing or unreadable file, keep going.
+                    self.stderr.write(f"{label} {image.pk}: {exc}")
+                    failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} images, {failed} failed."))
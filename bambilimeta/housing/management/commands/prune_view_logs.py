@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from housing.analytics import VIEW_LOG_RETENTION_DAYS, prune_view_logs
+
+
+class Command(BaseCommand):
+    help = "Delete raw ViewLog events older than the retention window (run daily). Rollups are kept."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=VIEW_LOG_RETENTION_DAYS,
+                            help="Keep this many days of raw events.")
+
+    def handle(self, *args, **options):
+        deleted = prune_view_logs(options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} view events older than {options['days']} days."))
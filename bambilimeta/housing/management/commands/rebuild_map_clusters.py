@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from housing.clusters import rebuild_clusters
+
+
+class Command(BaseCommand):
+    help = "Rebuild every precomputed map cluster from the House table (e.g. after loaddata or a bulk import)."
+
+    def handle(self, *args, **options):
+        written = rebuild_clusters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} map clusters."))
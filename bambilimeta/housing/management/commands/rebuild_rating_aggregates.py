@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from housing.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized review count, average and histogram of every house from HouseReview."
+
+    def handle(self, *args, **options):
+        reviewed = rebuild_rating_aggregates()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates, {reviewed} houses have reviews."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from housing.trending import rebuild_trending_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute House.trending_score from the ViewLog and favorites (e.g. after a bulk import)."
+
+    def handle(self, *args, **options):
+        scored = rebuild_trending_scores()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt trending scores, {scored} houses have recent interest."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from housing.warmup import warm_process, warm_shared
+
+
+class Command(BaseCommand):
+    help = "Fill the list pages' shared cache entries (hero homes, popular houses, hero product), e.g. after a deploy."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--refresh", action="store_true", help="Recompute the entries that are still fresh too.")
+
+    def handle(self, *args, **options):
+        warm_process()  # Also checks that the URLs and templates load.
+        warm_shared(refresh=options["refresh"])
+        self.stdout.write(self.style.SUCCESS("List page caches are warm."))
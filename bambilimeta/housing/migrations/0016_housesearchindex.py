@@ -0,0 +1,51 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the FTS5 virtual table and fill it with the existing houses.
+    FTS5 only exists on SQLite, other backends keep using the icontains fallback in housing.search.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS housing_house_fts USING fts5("
+        "title, location, house_desc, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO housing_house_fts (rowid, title, location, house_desc) "
+        "SELECT id, title, location, house_desc FROM housing_house"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS housing_house_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0015_alter_house_address_alter_house_house_desc_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, reverse_code=drop_search_index),
+        migrations.CreateModel(
+            name='HouseSearchIndex',
+            fields=[
+                ('house', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='housing.house')),
+                ('title', models.TextField()),
+                ('location', models.TextField()),
+                ('house_desc', models.TextField()),
+                ('document', models.TextField(db_column='housing_house_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'housing_house_fts',
+                'managed': False,
+            },
+        ),
+    ]
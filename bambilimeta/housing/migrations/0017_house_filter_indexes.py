@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0016_housesearchindex'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['price'], name='housing_hou_price_e3486e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['num_bedrooms', 'price'], name='housing_hou_num_bed_5d31d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['furnished', 'has_wifi', 'utilities_included', 'price'], name='housing_hou_furnish_f843fa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['max_occupants', 'price'], name='housing_hou_max_occ_88868a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['proximity_to_campus'], name='housing_hou_proximi_6b85b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['created_at'], name='housing_hou_created_f3c651_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['view_count'], name='housing_hou_view_co_9a580c_idx'),
+        ),
+    ]
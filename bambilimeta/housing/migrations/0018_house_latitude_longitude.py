@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:52
+
+import django.core.validators
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0017_house_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='latitude',
+            field=models.FloatField(blank=True, help_text='Latitude in decimal degrees, e.g. 6.0921', null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='longitude',
+            field=models.FloatField(blank=True, help_text='Longitude in decimal degrees, e.g. 10.2347', null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['latitude', 'longitude'], name='housing_hou_latitud_5530f1_idx'),
+        ),
+    ]
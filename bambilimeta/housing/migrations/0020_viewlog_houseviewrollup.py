@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 08:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0019_housemapcluster'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HouseViewRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_rollups', to='housing.house')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('house', 'period', 'bucket'), name='unique_view_rollup_bucket')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ViewLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('house', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_logs', to='housing.house')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timestamp'], name='housing_vie_timesta_0bc321_idx')],
+            },
+        ),
+    ]
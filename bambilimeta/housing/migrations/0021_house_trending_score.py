@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0020_viewlog_houseviewrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='trending_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['trending_score'], name='housing_hou_trendin_a13fd7_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_rating_aggregates(apps, schema_editor):
+    """Same as housing.ratings.rebuild_rating_aggregates, on the historical models."""
+    House = apps.get_model("housing", "House")
+    HouseReview = apps.get_model("housing", "HouseReview")
+    rows = HouseReview.objects.order_by().values("house_id").annotate(
+        review_count=Count("pk"),
+        rating_sum=Sum("rating"),
+        **{f"rating_{r}_count": Count("pk", filter=Q(rating=r)) for r in range(1, 6)},
+    )
+    for row in rows:
+        row["rating_average"] = row["rating_sum"] / row["review_count"]
+        House.objects.filter(pk=row.pop("house_id")).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0021_house_trending_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='rating_average',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='house',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_rating_aggregates, reverse_code=migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='house',
+            index=models.Index(fields=['rating_average', 'review_count'], name='housing_hou_rating__ab68ce_idx'),
+        ),
+    ]
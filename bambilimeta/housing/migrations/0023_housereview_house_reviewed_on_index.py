@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0022_house_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='housereview',
+            index=models.Index(fields=['house', 'reviewed_on'], name='housing_hou_house_i_8e3c19_idx'),
+        ),
+    ]
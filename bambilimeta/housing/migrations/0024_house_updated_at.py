@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0023_housereview_house_reviewed_on_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='house',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
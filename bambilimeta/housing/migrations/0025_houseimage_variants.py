@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0024_house_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='houseimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
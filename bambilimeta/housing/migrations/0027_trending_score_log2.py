@@ -0,0 +1,27 @@
+import math
+
+from django.db import migrations
+
+
+def to_log2(apps, schema_editor):
+    """Scores become the base-2 logarithm of what they were (housing.trending). 0.0 stays "no interest"."""
+    House = apps.get_model("housing", "House")
+    for pk, score in House.objects.filter(trending_score__gt=0).values_list("pk", "trending_score").iterator():
+        House.objects.filter(pk=pk).update(trending_score=math.log2(score))
+
+
+def from_log2(apps, schema_editor):
+    House = apps.get_model("housing", "House")
+    for pk, score in House.objects.exclude(trending_score=0).values_list("pk", "trending_score").iterator():
+        House.objects.filter(pk=pk).update(trending_score=2.0 ** score)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0026_houseupload'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_log2, from_log2),
+    ]
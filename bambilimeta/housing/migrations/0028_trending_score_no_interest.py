@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+NO_INTEREST = float("-inf")
+
+
+def zero_to_no_interest(apps, schema_editor):
+    """0.0 used to mean "no interest yet", but it is also a real log2 score: -inf takes over that role."""
+    House = apps.get_model("housing", "House")
+    House.objects.filter(trending_score=0.0).update(trending_score=NO_INTEREST)
+
+
+def no_interest_to_zero(apps, schema_editor):
+    House = apps.get_model("housing", "House")
+    House.objects.filter(trending_score=NO_INTEREST).update(trending_score=0.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('housing', '0027_trending_score_log2'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='house',
+            name='trending_score',
+            field=models.FloatField(default=float('-inf')),
+        ),
+        migrations.RunPython(zero_to_no_interest, no_interest_to_zero),
+    ]
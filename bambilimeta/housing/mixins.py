@@ -1,10 +1,20 @@
+import hashlib
+
 from django.contrib import messages
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+# Session flag set once the visitor has been welcomed. Listed in SESSION_COALESCED_KEYS, so setting
+# it does not cost a database write (see bambilimeta.sessions).
+WELCOMED_SESSION_KEY = "welcomed"
 
 
 class WelcomeMessageMixins:
     """
     The welcome_message is the default message that will be displayed to the user
     if the view explicitly does provide a message, it takes precedence
+    It is shown once per session, not on every hit.
     """
     welcome_message = None
     def get_welcome_message(self):
@@ -12,12 +22,14 @@ class WelcomeMessageMixins:
 
     def dispatch(self, request, *args, **kwargs):
         message = self.get_welcome_message()
-        if message:
+        if message and not request.session.get(WELCOMED_SESSION_KEY):
             messages.info(request, message)
+            request.session[WELCOMED_SESSION_KEY] = True
         return super().dispatch(request, *args, **kwargs)
 
 
 class RoleAwareMessageMixin:
+    """Welcome message for visitors, landlords, entrepreneurs and superusers, once per session."""
     welcome_message = None
 
     def get_welcome_message(self):
@@ -25,7 +37,7 @@ class RoleAwareMessageMixin:
 
     def dispatch(self, request, *args, **kwargs):
         message = self.get_welcome_message()
-        if message:
+        if message and not request.session.get(WELCOMED_SESSION_KEY):
             if request.user.is_authenticated:
                 role = getattr(request.user.profile, "role", None)
                 if role == "landlord":
@@ -36,4 +48,51 @@ class RoleAwareMessageMixin:
                     messages.info(request, message)
             else:
                 messages.info(request, message)
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+            request.session[WELCOMED_SESSION_KEY] = True
+        return super().dispatch(request, *args, **kwargs)
+
+
+def make_etag(*parts):
+    """A strong, quoted ETag built from the values a page depends on."""
+    return quote_etag(hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET/HEAD with 304 Not Modified when the client's copy is still current, before any
+    rendering. Subclasses return validators from get_etag / get_last_modified, computed from a cheap
+    query or cache reads only (never from the rendered page). Must come first in the bases, so a 304
+    skips the other mixins' dispatch too (e.g. the welcome message).
+
+    Pages that show django.contrib.messages get no validators at all: a redirect carrying a
+    message must render it, and a copy showing one must not be revalidated later.
+    """
+
+    def get_etag(self):
+        """Quoted ETag of the page (see make_etag), or None."""
+        return None
+
+    def get_last_modified(self):
+        """Last change of the page as an aware datetime, or None."""
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+        if messages.get_messages(request):  # Loads the pending messages without consuming them.
+            return super().dispatch(request, *args, **kwargs)
+        self.request, self.args, self.kwargs = request, args, kwargs  # Validators may need them.
+        etag = self.get_etag()
+        last_modified = self.get_last_modified()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if messages.get_messages(request):  # Added while rendering, e.g. the welcome message.
+                return response
+        if response.status_code in (200, 304):
+            if etag and not response.has_header("ETag"):
+                response.headers["ETag"] = etag
+            if timestamp and not response.has_header("Last-Modified"):
+                response.headers["Last-Modified"] = http_date(timestamp)
+        return response
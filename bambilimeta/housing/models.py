@@ -1,8 +1,47 @@
+import uuid
+
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth.models import User
+from .lookups import FullTextMatch
+from .images import ImageVariantsMixin
+
+
+class HouseQuerySet(models.QuerySet):
+    def for_cards(self, prefetch_images=True):
+        """
+        Everything a listing card needs, in a fixed number of queries no matter how many cards:
+        - the houses themselves, without the long house_desc / security_features columns,
+        - image_count as a correlated COUNT subquery (no GROUP BY on the listing query),
+        - all images of the page in one prefetch query.
+        Templates should use house.image_count and house.images.all (never .exists / .count).
+        :param prefetch_images: False when cards come from housing.fragments, which prefetches
+            card_images() for the cards it has to render only.
+        """
+        image_count = (
+            HouseImage.objects.filter(house=models.OuterRef("pk"))
+            .order_by().values("house").annotate(total=models.Count("pk")).values("total")
+        )
+        queryset = self.defer("house_desc", "security_features").annotate(
+            image_count=Coalesce(models.Subquery(image_count), 0)
+        )
+        return queryset.prefetch_related(self.card_images()) if prefetch_images else queryset
 
+    @staticmethod
+    def card_images():
+        return models.Prefetch("images", queryset=HouseImage.objects.order_by("pk"))
+
+    def for_detail(self):
+        """
+        The house of the detail page with its owner and the owner's profile (one JOINed query)
+        and its images (one prefetch query). Reviews are paged separately, see housing.views.review_page.
+        """
+        return self.select_related("owner__profile").prefetch_related(
+            models.Prefetch("images", queryset=HouseImage.objects.order_by("pk")),
+        )
 
 
 class House(models.Model):
@@ -22,15 +61,56 @@ class House(models.Model):
     proximity_to_campus = models.FloatField(
         help_text="Distance to campus in kilometers", default=1.0
     )
+    latitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text="Latitude in decimal degrees, e.g. 6.0921"
+    )
+    longitude = models.FloatField(
+        null=True, blank=True, validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text="Longitude in decimal degrees, e.g. 10.2347"
+    )
     max_occupants = models.PositiveSmallIntegerField(default=4)
     available_from = models.DateField(default=timezone.now)
     security_features = models.JSONField(
         default=dict,
         help_text="e.g. {'gated': True, 'guards': True, 'cctv': False}"
     )
-    video = models.FileField(upload_to="house_videos/")
+    # Optional in the form: large walkthroughs are sent afterwards in chunks, see housing.uploads.
+    video = models.FileField(upload_to="house_videos/", blank=True)
     view_count = models.PositiveIntegerField(default=0)
+    # Time-decayed interest from views and favorites, see housing.trending. Only the order is meaningful.
+    # -inf (housing.trending.NO_INTEREST) until the first event: below every real score, which may be negative.
+    trending_score = models.FloatField(default=float("-inf"))
+    # Review aggregates, maintained by housing.ratings. Never edit them by hand.
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_average = models.FloatField(default=0.0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
+    # Last change to anything the detail page shows: the house, its images or its reviews
+    # (housing.signals touches it for the latter two). Serves as its Last-Modified / ETag.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = HouseQuerySet.as_manager()
+
+    class Meta:
+        # Back the house list filters and sorts (see housing.filters).
+        indexes = [
+            models.Index(fields=["price"]),
+            models.Index(fields=["num_bedrooms", "price"]),
+            models.Index(fields=["furnished", "has_wifi", "utilities_included", "price"]),
+            models.Index(fields=["max_occupants", "price"]),
+            models.Index(fields=["proximity_to_campus"]),
+            models.Index(fields=["latitude", "longitude"]),  # Bounding-box prefilter of housing.geo
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["view_count"]),
+            models.Index(fields=["trending_score"]),
+            models.Index(fields=["rating_average", "review_count"]),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.location})"
@@ -46,17 +126,85 @@ class House(models.Model):
     def get_display_name(self):
         return self.title.upper()
 
+    @property
+    def rating_histogram(self):
+        """[(5, count), (4, count), ..., (1, count)] from the stored aggregates, no query."""
+        return [(stars, getattr(self, f"rating_{stars}_count")) for stars in range(5, 0, -1)]
 
-class HouseImage(models.Model):
+
+class HouseSearchIndex(models.Model):
+    """
+    Read-only view of the SQLite FTS5 table that indexes house text for search.
+
+    The table itself is a virtual table created in migration 0016 and kept in sync from
+    housing.signals, so Django never manages it (managed = False).
+
+    Fields:
+    - house: rowid of the FTS row, which is the primary key of the indexed house.
+    - title, location, house_desc: Indexed copies of the House columns.
+    - document: FTS5's hidden column named after the table. ``document__match`` searches all columns.
+    - rank: FTS5's hidden BM25 score. Lower is better, only valid inside a MATCH query.
+    """
+    house = models.OneToOneField(
+        House, primary_key=True, db_column="rowid", related_name="search_index", on_delete=models.DO_NOTHING
+    )
+    title = models.TextField()
+    location = models.TextField()
+    house_desc = models.TextField()
+    document = models.TextField(db_column="housing_house_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "housing_house_fts"
+
+
+HouseSearchIndex._meta.get_field("document").register_lookup(FullTextMatch)
+
+
+class HouseMapCluster(models.Model):
+    """
+    Precomputed map marker: all houses of one Web-Mercator grid cell at one zoom level.
+    Maintained by housing.clusters (incrementally from signals, or rebuild_map_clusters).
+
+    Fields:
+    - zoom, x, y: The grid cell.
+    - count: Number of houses in the cell.
+    - min_price, max_price: Price range of those houses.
+    - latitude, longitude: Centroid of the houses, where the marker is drawn.
+    - house: The house itself when the cell holds exactly one, else empty.
+    """
+    zoom = models.PositiveSmallIntegerField()
+    x = models.PositiveIntegerField()
+    y = models.PositiveIntegerField()
+    count = models.PositiveIntegerField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    house = models.ForeignKey(House, null=True, blank=True, related_name="+", on_delete=models.SET_NULL)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["zoom", "x", "y"], name="unique_map_cluster_cell"),
+        ]
+
+    def __str__(self):
+        return f"z{self.zoom} ({self.x}, {self.y}): {self.count} houses"
+
+
+class HouseImage(ImageVariantsMixin, models.Model):
     """
     Images associated with a house listing.
 
     Fields:
     - house: The related house.
-    - image: Actual image file stored in media directory.
+    - image: Actual image file stored in media directory, as uploaded.
+    - variants: Resized WebP/JPEG copies with their sizes, written by housing.images.
     """
     house = models.ForeignKey(House, related_name="images", on_delete=models.CASCADE)
     image = models.ImageField(upload_to="house_images")
+    variants = models.JSONField(default=list, blank=True, editable=False)
 
 class HouseReview(models.Model):
     """
@@ -75,6 +223,11 @@ class HouseReview(models.Model):
     rating = models.PositiveIntegerField()
     reviewed_on = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["house", "reviewed_on"]),  # Keyset pages of a house's reviews
+        ]
+
     def get_absolute_url(self):
         """Redirects to the associated house's detail page."""
         return self.house.get_absolute_url()
@@ -101,3 +254,89 @@ class Favorite(models.Model):
         return f"{self.user.username} - {self.house.title} (Favorited on {self.favorited_at})"
 
 
+
+
+class ViewLog(models.Model):
+    """
+    One detail-page view of a house. Append-only: rows are written in batches by
+    housing.counters and deleted only by the retention prune, never updated.
+    Reports read HouseViewRollup instead of this table.
+
+    Fields:
+    - house: The viewed house.
+    - user: The viewer, empty for anonymous visitors.
+    - ip_address: The viewer's IP address.
+    - timestamp: When the page was viewed.
+    """
+    house = models.ForeignKey(House, related_name="view_logs", on_delete=models.CASCADE)
+    user = models.ForeignKey(User, null=True, blank=True, related_name="+", on_delete=models.SET_NULL)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["timestamp"]),  # Retention prune
+        ]
+
+    def __str__(self):
+        return f"{self.house_id} viewed at {self.timestamp}"
+
+
+class HouseViewRollup(models.Model):
+    """
+    Number of views of a house in one hour or one day, kept up to date with every ViewLog batch.
+
+    Fields:
+    - house: The viewed house.
+    - period: "hour" or "day".
+    - bucket: Start of the hour/day (UTC).
+    - views: Views in that bucket.
+    """
+    HOUR = "hour"
+    DAY = "day"
+    PERIOD_CHOICES = [(HOUR, "Hour"), (DAY, "Day")]
+
+    house = models.ForeignKey(House, related_name="view_rollups", on_delete=models.CASCADE)
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["house", "period", "bucket"], name="unique_view_rollup_bucket"),
+        ]
+
+    def __str__(self):
+        return f"{self.house_id} {self.period} {self.bucket:%Y-%m-%d %H:00}: {self.views}"
+
+
+class HouseUpload(models.Model):
+    """
+    A chunked, resumable upload of a house video or image in progress (see housing.uploads).
+
+    Fields:
+    - id: Random, names the upload in its URL and its partial file.
+    - house / owner: The house the file will be attached to, and its owner who uploads it.
+    - kind: "video" (replaces House.video) or "image" (adds a HouseImage).
+    - filename: Name the client gave the file.
+    - size: Total size announced when starting, in bytes.
+    - sha256: Checksum announced when starting, verified once every byte arrived.
+    - offset: Bytes received and acknowledged so far, where the next chunk starts.
+    """
+    VIDEO = "video"
+    IMAGE = "image"
+    KIND_CHOICES = [(VIDEO, "Video"), (IMAGE, "Image")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    house = models.ForeignKey(House, related_name="uploads", on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, related_name="house_uploads", on_delete=models.CASCADE)
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64)
+    offset = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} for house {self.house_id}: {self.offset}/{self.size}"
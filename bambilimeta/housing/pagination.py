@@ -0,0 +1,227 @@
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class WindowCountPaginator(Paginator):
+    """
+    Paginator for querysets that already carry their total row count on every row.
+
+    A normal Paginator runs a separate ``COUNT(*)`` before it fetches the page. When the
+    queryset is annotated with ``Window(Count("pk"))`` (see housing.search.search_houses)
+    the database hands back the total with the page itself, so the count query is skipped.
+    """
+    count_attr = "search_total"
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().page(number)  # Let the parent raise the usual PageNotAnInteger
+
+        if number >= 1:
+            bottom = (number - 1) * self.per_page
+            rows = list(self.object_list[bottom:bottom + self.per_page])
+            if rows:
+                # count is a cached_property, so seeding the instance dict means it is never queried.
+                self.__dict__["count"] = getattr(rows[0], self.count_attr)
+                return self._get_page(rows, number, self)
+            if number == 1:
+                self.__dict__["count"] = 0
+                return self._get_page(rows, number, self)
+
+        # Out of range pages: fall back to the regular count so EmptyPage is raised as usual.
+        return super().page(number)
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder rounds datetimes to milliseconds, a cursor needs the exact stored value."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage:
+    """
+    One page of a KeysetPaginator. Quacks enough like django.core.paginator.Page for templates:
+    iterate it, and use has_next / has_previous with next_cursor / previous_cursor for the links.
+    There are no page numbers, a keyset page only knows its neighbours.
+    """
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f"<KeysetPage of {len(self.object_list)} objects>"
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination: instead of ``OFFSET n`` every page seeks past the last row of the
+    previous page, e.g. ``WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC``.
+    With an index on the sort keys page 500 costs the same as page 1, and no COUNT(*) runs unless
+    somebody reads ``paginator.count``.
+
+    Cursors are opaque url-safe tokens holding the sort key values of the boundary row and the
+    direction ("n" = rows after it, "p" = rows before it).
+
+    :param object_list: An ordered queryset. The ordering must end in a unique key, "pk" is appended if it does not.
+    :param per_page: Number of rows per page.
+    :param ordering: Optional field names overriding the queryset ordering, e.g. ("-created_at", "-pk").
+    """
+
+    def __init__(self, object_list, per_page, ordering=None):
+        self.per_page = int(per_page)
+        ordering = list(ordering or keyset_ordering(object_list) or ())
+        if not ordering:
+            raise ValueError("KeysetPaginator needs an ordered queryset.")
+        if ordering[-1].lstrip("-") not in ("pk", object_list.model._meta.pk.name):
+            ordering.append("-pk" if ordering[-1].startswith("-") else "pk")
+        self.keys = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+        self.object_list = object_list.order_by(*ordering)
+
+    @cached_property
+    def count(self):
+        """Only evaluated if a caller asks, the pages themselves never need it."""
+        return self.object_list.count()
+
+    def page(self, cursor=None):
+        """
+        Return the page after (or before) the row encoded in cursor. No cursor means the first page.
+        :raises InvalidPage: If the cursor cannot be decoded.
+        """
+        if not cursor:
+            rows = list(self.object_list[:self.per_page + 1])
+            return self._build_page(rows, forwards=True, came_from_cursor=False)
+
+        values, forwards = self.decode_cursor(cursor)
+        queryset = self.object_list.filter(self._seek(values, forwards))
+        if not forwards:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        return self._build_page(rows, forwards=forwards, came_from_cursor=True)
+
+    def _build_page(self, rows, forwards, came_from_cursor):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if forwards:
+            has_next, has_previous = has_more, came_from_cursor
+        else:
+            rows.reverse()  # Fetched backwards, show in the normal order.
+            has_next, has_previous = came_from_cursor, has_more
+
+        next_cursor = self.encode_cursor(rows[-1], forwards=True) if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0], forwards=False) if rows and has_previous else None
+        return KeysetPage(rows, self, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def _seek(self, values, forwards):
+        """
+        Build the row-value comparison "(k1, k2, ...) after/before (v1, v2, ...)" as plain ORs of ANDs,
+        so it works with mixed sort directions. The leading k1 >=/<= v1 term lets SQLite use the index.
+        """
+        condition = Q()
+        for index, (name, descending) in enumerate(self.keys):
+            lookup = "lt" if descending == forwards else "gt"
+            step = Q(**{f"{name}__{lookup}": values[index]})
+            for previous_index, (previous_name, _) in enumerate(self.keys[:index]):
+                step &= Q(**{previous_name: values[previous_index]})
+            condition |= step
+        first_name, first_descending = self.keys[0]
+        first_lookup = "lte" if first_descending == forwards else "gte"
+        return Q(**{f"{first_name}__{first_lookup}": values[0]}) & condition
+
+    def _field(self, name):
+        opts = self.object_list.model._meta
+        return opts.pk if name == "pk" else opts.get_field(name)
+
+    def encode_cursor(self, obj, forwards=True):
+        """Serialize the sort key values of obj into an opaque token."""
+        values = [getattr(obj, name) for name, _ in self.keys]
+        payload = json.dumps({"v": values, "d": "n" if forwards else "p"}, cls=CursorJSONEncoder)
+        return urlsafe_base64_encode(payload.encode())
+
+    def decode_cursor(self, cursor):
+        """
+        Turn a token back into typed sort key values.
+        :return: (values, forwards)
+        :raises InvalidPage: For tokens that were not produced by encode_cursor.
+        """
+        try:
+            payload = json.loads(urlsafe_base64_decode(cursor))
+            raw_values, direction = payload["v"], payload["d"]
+            if len(raw_values) != len(self.keys) or direction not in ("n", "p"):
+                raise ValueError(cursor)
+            values = [self._field(name).to_python(raw) for (name, _), raw in zip(self.keys, raw_values)]
+        except (ValueError, TypeError, KeyError, ValidationError):
+            raise InvalidPage("Invalid cursor")
+        return values, direction == "n"
+
+
+def keyset_ordering(queryset):
+    """
+    The plain field-name ordering of a queryset, or None if keyset pagination cannot follow it
+    (no ordering, ordering by expressions, or ordering by annotations such as a search rank).
+    """
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    if not ordering or not queryset.ordered:
+        return None
+    names = []
+    for name in ordering:
+        if not isinstance(name, str) or "__" in name or name.lstrip("-") in queryset.query.annotations:
+            return None
+        names.append(name)
+    return names
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that pages with KeysetPaginator (?cursor=<token>) instead of ?page=<n>.
+
+    Numbered pages are still served when the request asks for one (?page=3), or when the
+    queryset cannot be seeked (e.g. it is ordered by a search rank annotation).
+    """
+    cursor_kwarg = "cursor"
+
+    def use_keyset_pagination(self, queryset):
+        return self.page_kwarg not in self.request.GET and keyset_ordering(queryset) is not None
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_keyset_pagination(queryset):
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidPage as e:
+            raise Http404(f"Invalid page: {e}")
+        return paginator, page, page.object_list, page.has_other_pages()
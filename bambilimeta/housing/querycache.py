@@ -0,0 +1,182 @@
+"""
+Queryset result cache with per-table version invalidation.
+
+cached_queryset(qs) caches only the primary keys the query returned, under a key built from the
+normalized SQL + parameters and the current version of every table the result depends on. A hit
+costs one ``pk IN (...)`` lookup to hydrate the objects (with the queryset's own select_related,
+prefetches and annotations), a miss runs the query once and stores the IDs.
+
+Nothing is ever deleted: a write bumps the version of its table (see bump_table_version, wired to
+post_save/post_delete of House, HouseImage, Product and ProductImage), every key that included the
+old version becomes unreachable and simply expires. Bumps are coalesced per transaction, so saving
+a house with a formset of twenty images bumps each table once, on commit.
+
+Misses go through get_or_recompute, which adds stampede protection on top of any cache backend:
+- probabilistic early recomputation ("XFetch"): a request recomputes a value shortly before it
+  expires, with a probability that rises as expiry nears and with how slow the value is to build,
+  so a hot key is normally refreshed by a single request before it ever expires;
+- request coalescing: only the request holding the ``<key>:lock`` entry recomputes, the others keep
+  serving the previous value (kept past its expiry for that purpose) instead of piling onto the DB.
+  With no previous value they wait up to WAIT_TIMEOUT for it, then compute it themselves. The lock
+  holds a token of its own, so a request that outlived LOCK_TIMEOUT never releases a later lock.
+"""
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+
+from django.core.cache import cache as default_cache
+from django.db import transaction
+
+QUERY_CACHE_TIMEOUT = 60 * 15
+VERSION_TIMEOUT = None  # Versions must outlive every key built from them.
+STALE_FACTOR = 2  # Entries stay readable this many times their timeout, to be served while recomputing.
+LOCK_TIMEOUT = 30  # Seconds a recomputation may take before another request tries too.
+WAIT_TIMEOUT = 2  # Seconds a request without any value waits for another's recomputation.
+WAIT_STEP = 0.05
+
+_pending = threading.local()
+
+
+def _version_key(model):
+    return f"qc:version:{model._meta.db_table}"
+
+
+def table_version(model):
+    """Current version of a model's table, starting at 1."""
+    version = default_cache.get(_version_key(model))
+    if version is None:
+        default_cache.add(_version_key(model), 1, VERSION_TIMEOUT)
+        version = default_cache.get(_version_key(model), 1)
+    return version
+
+
+def _incr_version(model):
+    try:
+        default_cache.incr(_version_key(model))
+    except ValueError:  # Never read yet, any version is new.
+        default_cache.add(_version_key(model), 1, VERSION_TIMEOUT)
+
+
+class _PendingBumps:
+    """The tables written in the current transaction, bumped once when it commits."""
+
+    def __init__(self):
+        self.models = {}
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        for model in self.models.values():
+            _incr_version(model)
+
+
+def bump_table_version(model):
+    """
+    Invalidate every cached query that depends on model's table. Inside a transaction the bump waits
+    for the commit and happens once per table, however many rows were written.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _incr_version(model)
+        return
+    pending = getattr(_pending, "bumps", None)
+    # A rolled back transaction drops its on_commit callbacks, then a new batch is needed.
+    if pending is None or pending.done or not any(entry[1] is pending for entry in connection.run_on_commit):
+        pending = _pending.bumps = _PendingBumps()
+        transaction.on_commit(pending)
+    pending.models[model._meta.db_table] = model
+
+
+def query_cache_key(queryset, depends_on=()):
+    """Cache key of a queryset: its SQL and parameters plus the versions of the tables it reads."""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+    models = [queryset.model, *depends_on]
+    versions = ".".join(str(table_version(model)) for model in models)
+    return f"qc:{queryset.model._meta.label_lower}:{digest}:{versions}"
+
+
+def cached_queryset(queryset, depends_on=(), timeout=QUERY_CACHE_TIMEOUT, refresh=False):
+    """
+    Evaluate a queryset through the ID-list cache.
+    :param queryset: Any queryset, sliced or not.
+    :param depends_on: Other models whose writes must invalidate the result (e.g. HouseImage when
+        the ordering or filters involve images). The queryset's own model is always included.
+    :param timeout: Seconds a result may be served without any write to its tables.
+    :param refresh: Recompute even if the cached result is fresh (cache warming, see housing.warmup).
+    :return: A list of model instances, in the queryset's order.
+    """
+    objects = None
+
+    def compute():
+        nonlocal objects
+        objects = list(queryset.all())  # A clone, queryset may be reused and must not keep its results.
+        return [obj.pk for obj in objects]
+
+    ids = get_or_recompute(query_cache_key(queryset, depends_on), compute, timeout, refresh=refresh)
+    return objects if objects is not None else hydrate(queryset, ids)
+
+
+def hydrate(queryset, ids):
+    """Load the objects with the given primary keys in one query, in the order of ids."""
+    if not ids:
+        return []
+    hydrating = queryset._chain()
+    hydrating.query.clear_limits()
+    hydrating.query.clear_ordering(force=True)
+    by_pk = {obj.pk: obj for obj in hydrating.filter(pk__in=ids)}
+    return [by_pk[pk] for pk in ids if pk in by_pk]
+
+
+def get_or_recompute(key, compute, timeout, beta=1.0, cache=None, refresh=False):
+    """
+    cache.get_or_set with stampede protection (see the module docstring).
+    :param key: Cache key.
+    :param compute: Callable returning the value, called at most once per call.
+    :param timeout: Seconds the value is considered fresh.
+    :param beta: > 1 recomputes earlier, < 1 later. 1 is the usual choice.
+    :param cache: Cache to use, the default cache if None.
+    :param refresh: Recompute even if the value is fresh, unless somebody else already is.
+    :return: The cached or freshly computed value.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)  # (value, seconds it took to compute, expiry timestamp)
+    now = time.time()
+    if entry is not None:
+        value, delta, expiry = entry
+        # XFetch: -log(random) is an exponential sample, so recomputation gets likelier as expiry approaches.
+        if not refresh and now - delta * beta * math.log(1.0 - random.random()) < expiry:
+            return value
+    else:
+        value = None
+
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    locked = cache.add(lock_key, token, LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return value  # Somebody else is recomputing, the stale value is good enough meanwhile.
+        # Cold cache: wait a little for the other request instead of computing the same thing in parallel.
+        deadline = now + WAIT_TIMEOUT
+        while time.time() < deadline:
+            time.sleep(WAIT_STEP)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+            if not cache.has_key(lock_key):
+                break  # The other request failed, nothing is coming.
+        # The other request died or is too slow, compute it ourselves.
+
+    try:
+        started = time.time()
+        value = compute()
+        delta = time.time() - started
+        cache.set(key, (value, delta, time.time() + timeout), timeout * STALE_FACTOR)
+    finally:
+        # Only our own lock: past LOCK_TIMEOUT it may have expired and been taken by another request.
+        if locked and cache.get(lock_key) == token:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,64 @@
+"""
+Denormalized review aggregates on House: review_count, rating_sum, rating_average and the
+rating_<n>_count histogram (n = 1..5).
+
+Every review insert, edit and delete adjusts them with a single relative UPDATE
+(``rating_sum = rating_sum + 4`` ...) from housing.signals, so listing cards and the
+"Best rated" sort never aggregate HouseReview. ReviewCreateReview saves inside a transaction,
+so the review and the new aggregates are committed together. rebuild_rating_aggregates
+(``manage.py rebuild_rating_aggregates``) recomputes everything from HouseReview.
+"""
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from .models import House, HouseReview
+
+RATINGS = range(1, 6)
+
+
+def histogram_field(rating):
+    return f"rating_{rating}_count"
+
+
+def adjust_rating(house_id, rating, delta):
+    """
+    Add (delta=1) or remove (delta=-1) one review with the given rating from a house's aggregates.
+    """
+    rating = int(rating)
+    new_sum = F("rating_sum") + delta * rating
+    new_count = F("review_count") + delta
+    changes = {
+        "review_count": new_count,
+        "rating_sum": new_sum,
+        # Right-hand F()s read the row before the UPDATE, so the average is computed from the new totals.
+        "rating_average": Coalesce(
+            Cast(new_sum, FloatField()) / NullIf(new_count, 0), Value(0.0), output_field=FloatField()
+        ),
+    }
+    if rating in RATINGS:
+        changes[histogram_field(rating)] = F(histogram_field(rating)) + delta
+    House.objects.filter(pk=house_id).update(**changes)
+
+
+def rebuild_rating_aggregates():
+    """
+    Recompute the aggregates of every house from HouseReview: one GROUP BY query, one bulk UPDATE.
+    :return: Number of houses with at least one review.
+    """
+    rows = HouseReview.objects.order_by().values("house_id").annotate(
+        review_count=Count("pk"),
+        rating_sum=Sum("rating"),
+        **{histogram_field(r): Count("pk", filter=Q(rating=r)) for r in RATINGS},
+    )
+    houses = []
+    for row in rows:
+        house = House(pk=row.pop("house_id"), **row)
+        house.rating_average = house.rating_sum / house.review_count
+        houses.append(house)
+
+    fields = ["review_count", "rating_sum", "rating_average"] + [histogram_field(r) for r in RATINGS]
+    with transaction.atomic():
+        House.objects.update(**{name: 0 for name in fields})
+        House.objects.bulk_update(houses, fields, batch_size=500)
+    return len(houses)
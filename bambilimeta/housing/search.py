@@ -0,0 +1,114 @@
+"""
+Full-text search for houses, backed by an SQLite FTS5 index (housing_house_fts).
+
+- index_house / unindex_house keep the index in sync and are called from housing.signals.
+- search_houses narrows a House queryset to the rows matching a free-text query, ordered by
+  BM25 relevance, with the total hit count attached to every row as ``search_total``.
+  One query therefore returns both the page and the number of hits.
+- Databases other than SQLite fall back to the old icontains filter.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count, F, Q, Window
+
+from .models import HouseSearchIndex
+
+SEARCH_FIELDS = ("title", "location", "house_desc")
+
+# FTS5 has its own query syntax (quotes, NEAR, column filters, -, ...).
+# We only keep the plain words the user typed and quote each one, so user input can never
+# produce a syntax error. The trailing * makes every word a prefix match: "bamb" finds "Bambili".
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def is_supported():
+    """FTS5 is an SQLite feature. Other backends use the icontains fallback."""
+    return connection.vendor == "sqlite"
+
+
+def build_match_expression(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression.
+    :param query: Raw text from the search box, e.g. 'Bambili, 2 rooms!'
+    :return: e.g. '"Bambili"* "2"* "rooms"*', or an empty string if there is nothing to search for.
+    """
+    return " ".join(f'"{term}"*' for term in TOKEN_RE.findall(query or ""))
+
+
+def index_house(house):
+    """
+    Insert or refresh the index row for a single house.
+    :param house: A saved House instance.
+    """
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM housing_house_fts WHERE rowid = %s", [house.pk]
+        )
+        cursor.execute(
+            "INSERT INTO housing_house_fts (rowid, title, location, house_desc) VALUES (%s, %s, %s, %s)",
+            [house.pk, house.title, house.location, house.house_desc],
+        )
+
+
+def unindex_house(house_id):
+    """Remove a deleted house from the index."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM housing_house_fts WHERE rowid = %s", [house_id])
+
+
+def rebuild_index():
+    """Drop every index row and re-index all houses in one statement."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM housing_house_fts")
+        cursor.execute(
+            "INSERT INTO housing_house_fts (rowid, title, location, house_desc) "
+            "SELECT id, title, location, house_desc FROM housing_house"
+        )
+
+
+def match_houses(queryset, query):
+    """
+    Filter a House queryset down to the houses matching query, without ranking or counting.
+    Used where only the set of hits matters, e.g. facet counts.
+    :param queryset: The House queryset to search in.
+    :param query: Free text typed by the user.
+    :return: The filtered queryset. Empty if the query has no searchable words.
+    """
+    expression = build_match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not is_supported():
+        return queryset.filter(
+            Q(title__icontains=query) | Q(location__icontains=query) | Q(house_desc__icontains=query)
+        )
+    return queryset.filter(search_index__document__match=expression)
+
+
+def search_houses(queryset, query):
+    """
+    Filter a House queryset down to the houses matching query.
+
+    Matching rows are annotated with:
+    - search_rank: BM25 score (lower is more relevant), used for ordering.
+    - search_total: COUNT(*) OVER () - the number of hits for the whole search, not just the page.
+
+    :param queryset: The House queryset to search in.
+    :param query: Free text typed by the user.
+    :return: The filtered and ranked queryset. Empty if the query has no searchable words.
+    """
+    queryset = match_houses(queryset, query)
+    if not is_supported():
+        return queryset.annotate(search_total=Window(Count("pk"))).order_by("-created_at", "-pk")
+
+    return (
+        queryset
+        .annotate(search_rank=F("search_index__rank"), search_total=Window(Count("pk")))
+        .order_by("search_rank", "-pk")
+    )
@@ -1,18 +1,171 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.core.cache import cache
-from .models import House
+from django.utils import timezone
+from users.models import Profile
+from .models import House, HouseImage, HouseReview, Favorite
+from .favorites import invalidate_favorite_house_ids
+from . import search, clusters, trending, ratings, querycache, fragments, images
+from .tasks import queue_list_cache_warming, queue_map_cells
+
+# Columns bumped by counters (housing.counters, housing.trending). Saving only these does not
+# change what a cached listing query returns closely enough to throw all of them away.
+VOLATILE_FIELDS = {"view_count", "trending_score"}
+
 
 @receiver([post_save, post_delete], sender=House)
-def refresh_hero_home_cache(sender, **kwargs):
-    """
-    This ensures cache is always fresh when data changes
-    Well the post_save and post_delete signals are fired when a model is saved, updated or deleted, and
-     a call is made to the receiver function. The receiver function refreshes the cache by
-     retrieving a list of the first three houses and storing it in the cache.
-    :param sender:
-    :param kwargs:
-    :return:
-    """
-    hero_homes = list(House.objects.all()[:2])
-    cache.set("hero_home_list", hero_homes, 900)
\ No newline at end of file
+@receiver([post_save, post_delete], sender=HouseImage)
+@receiver([post_save, post_delete], sender=HouseReview)
+def bump_query_cache_version(sender, update_fields=None, **kwargs):
+    """
+    Invalidate every cached query over the written table (see housing.querycache). One cache
+    increment, no query; several writes in one transaction are coalesced into one bump.
+    """
+    if update_fields is not None and set(update_fields) <= VOLATILE_FIELDS:
+        return
+    querycache.bump_table_version(sender)
+    if sender is not HouseReview:
+        queue_list_cache_warming()  # Hero and popular houses (housing.warmup) depend on these tables.
+
+
+@receiver([post_save, post_delete], sender=House)
+@receiver([post_save, post_delete], sender=HouseImage)
+def bump_house_card_version(sender, instance, update_fields=None, **kwargs):
+    """The house or one of its images changed, so its cached list card (housing.fragments) is stale."""
+    if update_fields is not None and set(update_fields) <= VOLATILE_FIELDS:
+        return
+    fragments.bump_card_version(House, instance.pk if sender is House else instance.house_id)
+
+
+@receiver([post_save, post_delete], sender=HouseImage)
+@receiver([post_save, post_delete], sender=HouseReview)
+def touch_house(sender, instance, raw=False, **kwargs):
+    """
+    The detail page shows the images and reviews, so changing one moves House.updated_at, the
+    page's ETag / Last-Modified. A plain UPDATE, the house's own save signals have nothing to do.
+    """
+    if raw:
+        return
+    House.objects.filter(pk=instance.house_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Profile)
+def touch_owner_houses(sender, instance, raw=False, update_fields=None, **kwargs):
+    """The detail page shows the owner's phone number, so a profile save moves their houses' updated_at too."""
+    if raw or (update_fields is not None and "phone_number" not in update_fields):
+        return
+    House.objects.filter(owner_id=instance.user_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=HouseImage)
+def queue_image_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    """A photo was uploaded or replaced: resize it in the background once committed (housing.images)."""
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    if instance.image and not instance.variants_ready:
+        images.queue_image(instance)
+
+
+@receiver(post_save, sender=House)
+def update_house_search_index(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Keep the full-text index (housing_house_fts) in sync with the saved house.
+    Saves that only touch non-searchable columns (e.g. update_fields=["view_count"]) are skipped.
+    Fixture loads (raw) are skipped too, run housing.search.rebuild_index() after loaddata.
+    """
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(search.SEARCH_FIELDS):
+        return
+    search.index_house(instance)
+
+
+@receiver(post_delete, sender=House)
+def remove_house_from_search_index(sender, instance, **kwargs):
+    """Drop the deleted house from the full-text index."""
+    search.unindex_house(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+def invalidate_favorite_ids(sender, instance, **kwargs):
+    """A favorite was added or removed, so the user's cached favorite-ID set is stale."""
+    invalidate_favorite_house_ids(instance.user_id)
+
+
+@receiver(post_save, sender=Favorite)
+def add_favorite_to_trending(sender, instance, created, raw=False, **kwargs):
+    """A new favorite bumps the house's trending score (removing it later does not take it back)."""
+    if created and not raw:
+        trending.add_points({instance.house_id: trending.event_points(instance.favorited_at, trending.FAVORITE_WEIGHT)})
+
+
+CLUSTER_FIELDS = {"latitude", "longitude", "price"}
+
+
+@receiver(pre_save, sender=House)
+def remember_map_position(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Remember where the house was and its price before this save, to tell whether its map cells change.
+    Skipped for new houses and for saves that cannot move it (e.g. update_fields=["view_count"]).
+    """
+    instance._old_map_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & CLUSTER_FIELDS:
+        return
+    instance._old_map_state = (
+        House.objects.filter(pk=instance.pk).values_list("latitude", "longitude", "price").first()
+    )
+
+
+@receiver(post_save, sender=House)
+def refresh_map_clusters(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """
+    Queue the recount of the map cluster cells the house left and entered (see housing.clusters).
+    An edit that keeps its position and price (a new title, a description) queues nothing.
+    """
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & CLUSTER_FIELDS:
+        return
+    old = None if created else getattr(instance, "_old_map_state", None)
+    new = (instance.latitude, instance.longitude, instance.price)
+    if old is not None and (old[0], old[1], float(old[2])) == (new[0], new[1], float(new[2])):
+        return
+    queue_map_cells(clusters.cells_of(old and old[:2]) | clusters.cells_of(new[:2]))
+
+
+@receiver(post_delete, sender=House)
+def remove_house_from_map_clusters(sender, instance, **kwargs):
+    """The house is gone, recount the cells it was in."""
+    queue_map_cells(clusters.cells_of((instance.latitude, instance.longitude)))
+
+
+@receiver(pre_save, sender=HouseReview)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    """Remember the stored house/rating of an edited review, so the aggregates can swap old for new."""
+    instance._old_rating = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._old_rating = HouseReview.objects.filter(pk=instance.pk).values_list("house_id", "rating").first()
+
+
+@receiver(post_save, sender=HouseReview)
+def add_review_to_ratings(sender, instance, created, raw=False, **kwargs):
+    """Count a new review, or move an edited one from its old rating to the new one."""
+    if raw:
+        return
+    old = getattr(instance, "_old_rating", None)
+    if not created and old is not None:
+        if old == (instance.house_id, int(instance.rating)):
+            return  # Only the comment changed.
+        ratings.adjust_rating(*old, delta=-1)
+        fragments.bump_card_version(House, old[0])
+    ratings.adjust_rating(instance.house_id, instance.rating, delta=1)
+    fragments.bump_card_version(House, instance.house_id)  # The card shows the average rating.
+
+
+@receiver(post_delete, sender=HouseReview)
+def remove_review_from_ratings(sender, instance, **kwargs):
+    """Take a deleted review out of its house's aggregates (harmless when the house is being deleted too)."""
+    ratings.adjust_rating(instance.house_id, instance.rating, delta=-1)
+    fragments.bump_card_version(House, instance.house_id)
@@ -0,0 +1,89 @@
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import transaction
+
+from tasks.queue import task
+
+from . import clusters, images, uploads, warmup
+from .analytics import prune_view_logs
+from .counters import FLUSH_INTERVAL, flush_view_counts
+
+
+@task(priority=10, max_attempts=3)
+def make_image_variants(label, pk, name):
+    """Render and store the variants of an uploaded image. See housing.images."""
+    image = apps.get_model(label).objects.filter(pk=pk).first()
+    if image is None or image.image.name != name:
+        return  # Deleted or replaced since, the new upload has a task of its own.
+    images.process_image(image)
+
+
+@task(priority=5)
+def refresh_map_cells(cells):
+    """Recount map cluster cells, given as [zoom, x, y] lists (housing.clusters)."""
+    clusters.refresh_cells(tuple(cell) for cell in cells)
+
+
+def queue_map_cells(cells):
+    """Recount cells in a worker: up to one per zoom level each aggregating a range of the house table."""
+    if cells:
+        refresh_map_cells.delay(sorted(cells))
+
+
+@task(every=FLUSH_INTERVAL, priority=5)
+def flush_buffered_views():
+    flush_view_counts()
+
+
+@task(every=timedelta(days=1), priority=-10)
+def prune_old_view_logs():
+    prune_view_logs()
+
+
+@task(every=timedelta(hours=1), priority=-10)
+def purge_stale_uploads():
+    """Delete chunked uploads abandoned halfway, and their partial files (housing.uploads)."""
+    uploads.purge_stale_uploads()
+
+
+@task(every=warmup.REFRESH_INTERVAL, priority=3)
+def refresh_list_caches():
+    """Recompute the list pages' cached entries shortly before they expire, so no request finds them cold."""
+    warmup.warm_shared(refresh=True)
+
+
+@task(priority=3)
+def warm_list_caches():
+    """Compute the list pages' entries a write just invalidated (new table versions), before a visitor does."""
+    warmup.warm_shared()
+
+
+class _PendingWarming:
+    """on_commit callback queuing warm_list_caches, one per transaction (like querycache._PendingBumps)."""
+
+    def __init__(self):
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        warm_list_caches.apply_async(unique_key="warm_list_caches")  # Already queued: nothing to do.
+
+
+_pending = threading.local()
+
+
+def queue_list_cache_warming():
+    """
+    Queue warm_list_caches once the current transaction commits, once per transaction. Registered
+    after the version bumps of housing.querycache, so it is queued after they ran. Robust: a
+    failure is logged and never fails the write that triggered it.
+    """
+    connection = transaction.get_connection()
+    pending = getattr(_pending, "warming", None)
+    if (connection.in_atomic_block and pending is not None and not pending.done
+            and any(entry[1] is pending for entry in connection.run_on_commit)):
+        return
+    pending = _pending.warming = _PendingWarming()
+    transaction.on_commit(pending, robust=True)
@@ -0,0 +1,200 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from bambilimeta.cache import SQLiteCache
+from bambilimeta.sessions import SessionStore
+from ..querycache import get_or_recompute
+
+
+def bump(path, times):
+    cache = SQLiteCache(path, {})
+    for _ in range(times):
+        cache.incr("counter")
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite3")
+        self.cache = SQLiteCache(self.path, {"OPTIONS": {"MAX_ENTRIES": 50, "CULL_FREQUENCY": 1}})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_basic_operations(self):
+        self.cache.set("a", {"x": 1}, 60)
+        self.assertEqual(self.cache.get("a"), {"x": 1})
+        self.assertFalse(self.cache.add("a", 2))
+        self.assertTrue(self.cache.add("b", 2))
+        self.assertEqual(self.cache.incr("b", 3), 5)
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": {"x": 1}, "b": 5})
+        self.cache.delete_many(["a", "b"])
+        self.assertIsNone(self.cache.get("a"))
+        with self.assertRaises(ValueError):
+            self.cache.incr("missing")
+
+    def test_expired_entries_are_gone_and_can_be_added_again(self):
+        self.cache.set("short", 1, 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get("short"))
+        self.assertTrue(self.cache.add("short", 2))
+        self.assertEqual(self.cache.get("short"), 2)
+
+    def test_cull_keeps_max_entries(self):
+        for i in range(80):
+            self.cache.set(f"k{i}", i)
+        self.assertLessEqual(len(self.cache.get_many([f"k{i}" for i in range(80)])), 50)
+
+    def test_shared_between_processes(self):
+        self.cache.set("counter", 0)
+        context = multiprocessing.get_context("fork")
+        workers = [context.Process(target=bump, args=(self.path, 50)) for _ in range(3)]
+        for worker in workers:
+            worker.start()
+        bump(self.path, 50)
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get("counter"), 200)  # No lost increments.
+
+
+class GetOrRecomputeTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = SQLiteCache(os.path.join(self.directory.name, "cache.sqlite3"), {})
+        self.calls = 0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def test_fresh_value_is_reused(self):
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 1)
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_is_served_while_another_request_recomputes(self):
+        get_or_recompute("k", self.compute, 0.2, cache=self.cache)
+        time.sleep(0.25)  # Expired, but still readable as a stale value (STALE_FACTOR).
+        self.cache.add("k:lock", 1, 30)  # Another worker is recomputing.
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 1)
+        self.assertEqual(self.calls, 1)
+
+        self.cache.delete("k:lock")
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 2)
+
+    def test_slow_values_are_recomputed_early(self):
+        self.cache.set("k", ("old", 1e6, time.time() + 60), 120)  # Took ~11 days to build, expires in 60s.
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 1)
+
+    def test_cold_cache_waits_only_briefly_for_a_stuck_recomputation(self):
+        from .. import querycache
+        self.cache.add("k:lock", "other", 30)  # A worker that hangs with the lock.
+        started = time.time()
+        with mock.patch.object(querycache, "WAIT_TIMEOUT", 0.2):
+            self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 1)
+        self.assertLess(time.time() - started, 5)
+        self.assertEqual(self.cache.get("k:lock"), "other")  # Not ours to release.
+
+    def test_expired_lock_taken_by_another_request_is_kept(self):
+        def slow_compute():
+            self.cache.set("k:lock", "next", 30)  # Ours expired meanwhile and another request took it.
+            return self.compute()
+
+        self.assertEqual(get_or_recompute("k", slow_compute, 60, cache=self.cache), 1)
+        self.assertEqual(self.cache.get("k:lock"), "next")
+
+    def test_refresh_recomputes_fresh_values(self):
+        get_or_recompute("k", self.compute, 60, cache=self.cache)
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache, refresh=True), 2)
+        self.assertEqual(get_or_recompute("k", self.compute, 60, cache=self.cache), 2)
+
+
+class CoalescingSessionTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_bookkeeping_only_sessions_stay_in_the_cache(self):
+        session = SessionStore()
+        session["welcomed"] = True
+        session.save()
+        self.assertFalse(Session.objects.exists())
+        self.assertTrue(SessionStore(session.session_key)["welcomed"])
+
+        with mock.patch("bambilimeta.sessions.COALESCE_INTERVAL", 0):
+            session = SessionStore(session.session_key)
+            session["welcomed"] = False
+            session.save()
+        self.assertTrue(Session.objects.filter(session_key=session.session_key).exists())
+
+    def test_durable_changes_are_written_through(self):
+        session = SessionStore()
+        session["welcomed"] = True
+        session.save()
+        session = SessionStore(session.session_key)
+        session["cart"] = [1, 2]
+        session.save()
+        stored = Session.objects.get(session_key=session.session_key).get_decoded()
+        self.assertEqual(stored, {"welcomed": True, "cart": [1, 2]})
+
+    def test_unchanged_sessions_are_not_saved(self):
+        session = SessionStore()
+        session["cart"] = [1]
+        session.save()
+        session = SessionStore(session.session_key)
+        session["cart"] = [1]
+        with self.assertNumQueries(0):
+            session.save()
+
+    def test_welcome_message_once_per_session_without_database_writes(self):
+        from ..views import HouseListView
+        with mock.patch.object(HouseListView, "welcome_message", "Welcome!"):
+            self.assertContains(self.client.get(reverse("housing:home")), "Welcome!")
+            self.assertNotContains(self.client.get(reverse("housing:home")), "Welcome!")
+        self.assertFalse(Session.objects.exists())
+
+
+class ListCacheWarmingTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        from ..models import House
+        cache.clear()
+        owner = get_user_model().objects.create_user(username="landlord", password="testpass123")
+        with self.captureOnCommitCallbacks(execute=True):  # TestCase never commits, run the version bumps.
+            self.house = House.objects.create(title="Studio", owner=owner, location="Bambili",
+                                              price=100, house_desc="desc")
+
+    def test_warmed_entries_are_served_without_recomputing(self):
+        from ..models import House, HouseImage
+        from ..querycache import QUERY_CACHE_TIMEOUT, query_cache_key
+        from ..warmup import warm_up
+        warm_up()
+        key = query_cache_key(House.objects.for_cards().order_by("pk")[:3], [HouseImage])
+        ids = get_or_recompute(key, lambda: self.fail("Cold entry"), QUERY_CACHE_TIMEOUT)
+        self.assertEqual(ids, [self.house.pk])
+        self.assertContains(self.client.get(reverse("market:home")), "</html>")  # No product: no hero product.
+
+    def test_writes_queue_one_warming_per_burst(self):
+        from tasks.models import Task
+        Task.objects.all().delete()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.house.title = "Loft"
+            self.house.save()
+            self.house.save()
+        self.assertFalse(Task.objects.exists())  # Nothing on the write path itself.
+        for callback in callbacks:
+            callback()
+        self.house.save()  # Again after the commit: already queued.
+        self.assertEqual(Task.objects.filter(name="housing.tasks.warm_list_caches").count(), 1)
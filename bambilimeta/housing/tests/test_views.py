@@ -0,0 +1,966 @@
+from django.test import TestCase
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from ..models import House
+from ..search import build_match_expression, search_houses
+
+User = get_user_model()
+
+
+def flush_buffered_views():
+    """Flush every view recorded so far: a generation is applied once a later flush closed the next one."""
+    from ..counters import flush_view_counts
+    return flush_view_counts() + flush_view_counts()
+
+
+class HouseSearchTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.studio = House.objects.create(
+            title='Bright studio', owner=self.user, location='Bambili', price=150,
+            house_desc='Small studio next to the university gate'
+        )
+        self.villa = House.objects.create(
+            title='Garden villa', owner=self.user, location='Bamenda', price=600,
+            house_desc='Villa with a large garden'
+        )
+        self.url = reverse('housing:home')
+
+    def test_build_match_expression_strips_fts_syntax(self):
+        self.assertEqual(build_match_expression('garden "villa" -NEAR('), '"garden"* "villa"* "NEAR"*')
+        self.assertEqual(build_match_expression('  !! '), '')
+
+    def test_search_ranks_and_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            results = list(search_houses(House.objects.all(), 'garden'))
+        self.assertEqual(results, [self.villa])
+        self.assertEqual(results[0].search_total, 1)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.studio.title = 'Cosy garden studio'
+        self.studio.save()
+        self.assertEqual(search_houses(House.objects.all(), 'cosy').get(), self.studio)
+
+        self.villa.delete()
+        self.assertEqual(list(search_houses(House.objects.all(), 'villa')), [])
+
+    def test_prefix_match_from_list_view(self):
+        response = self.client.get(self.url, {'q': 'univ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['houses']), [self.studio])
+        self.assertEqual(response.context['paginator'].count, 1)
+
+    def test_no_match_falls_back_to_all_houses(self):
+        response = self.client.get(self.url, {'q': 'castle'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['houses']), 2)
+
+
+class HouseFilterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.cheap = House.objects.create(
+            title='Cheap room', owner=self.user, location='Bambili', price=80,
+            house_desc='Single room', num_bedrooms=1, furnished=True, proximity_to_campus=0.4
+        )
+        self.family = House.objects.create(
+            title='Family house', owner=self.user, location='Bambui', price=400,
+            house_desc='Three bedroom house', num_bedrooms=3, has_wifi=False, proximity_to_campus=2.5
+        )
+        self.big = House.objects.create(
+            title='Big house', owner=self.user, location='Bambui', price=700,
+            house_desc='Five bedroom house', num_bedrooms=5, utilities_included=True, proximity_to_campus=4
+        )
+        self.url = reverse('housing:home')
+
+    def test_filters_and_sort(self):
+        response = self.client.get(self.url, {'min_price': 100, 'sort': '-price'})
+        self.assertEqual(list(response.context['houses']), [self.big, self.family])
+
+        response = self.client.get(self.url, {'bedrooms': ['1', '4'], 'sort': 'price'})
+        self.assertEqual(list(response.context['houses']), [self.cheap, self.big])
+
+        response = self.client.get(self.url, {'furnished': 'on', 'max_distance': 1})
+        self.assertEqual(list(response.context['houses']), [self.cheap])
+
+    def test_facets_come_from_one_query(self):
+        from ..filters import house_facets
+        with self.assertNumQueries(1):
+            facets = house_facets(House.objects.all())
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual([b['count'] for b in facets['bedrooms']], [1, 0, 1, 1])
+        self.assertEqual([b['count'] for b in facets['price']], [1, 0, 1, 1])
+        self.assertEqual({a['value']: a['count'] for a in facets['amenities']},
+                         {'furnished': 1, 'has_wifi': 2, 'utilities_included': 1})
+
+    def test_facets_follow_search(self):
+        response = self.client.get(self.url, {'q': 'bedroom'})
+        self.assertEqual(response.context['facets']['total'], 2)
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        from django.utils import timezone
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        same_time = timezone.now()
+        # Several houses share created_at, so the id tie-breaker must keep pages disjoint.
+        self.houses = [
+            House.objects.create(
+                title=f'House {i}', owner=self.user, location='Bambili', price=100 + i,
+                house_desc='desc', created_at=same_time if i % 2 else timezone.now()
+            )
+            for i in range(8)
+        ]
+
+    def test_walk_forwards_and_back(self):
+        from ..pagination import KeysetPaginator
+        paginator = KeysetPaginator(House.objects.order_by('-created_at', '-pk'), 3)
+        expected = list(House.objects.order_by('-created_at', '-pk'))
+
+        seen, page = [], paginator.page()
+        pages = [page]
+        seen += list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            pages.append(page)
+            seen += list(page)
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 3)
+
+        previous = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[-2]))
+        self.assertTrue(previous.has_next())
+
+    def test_trending_order_pages_past_houses_without_interest(self):
+        from ..pagination import KeysetPaginator
+        from ..trending import add_points
+        add_points({self.houses[2].pk: 0.0, self.houses[5].pk: -3.0})  # The others have no interest (-inf).
+        paginator = KeysetPaginator(House.objects.order_by('-trending_score', '-pk'), 3)
+        seen, page = list(paginator.page()), paginator.page()
+        while page.has_next():
+            page = paginator.page(page.next_cursor)
+            seen += list(page)
+        self.assertEqual(seen, list(House.objects.order_by('-trending_score', '-pk')))
+        self.assertEqual(seen[:2], [self.houses[2], self.houses[5]])
+
+    def test_list_view_pages_by_cursor_without_count(self):
+        url = reverse('housing:home')
+        response = self.client.get(url)
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 6)
+        self.assertNotIn('count', response.context['paginator'].__dict__)
+
+        response = self.client.get(url, {'cursor': page.next_cursor})
+        self.assertEqual(len(response.context['houses']), 2)
+        self.assertFalse(response.context['page_obj'].has_next())
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('housing:home'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+class FavoriteStateTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='landlord', password='testpass123')
+        self.student = User.objects.create_user(username='student', password='testpass123')
+        self.houses = [
+            House.objects.create(title=f'House {i}', owner=self.owner, location='Bambili', price=100, house_desc='desc')
+            for i in range(4)
+        ]
+        self.client.login(username='student', password='testpass123')
+
+    def test_hearts_follow_toggle(self):
+        url = reverse('housing:home')
+        response = self.client.get(url)
+        self.assertFalse(any(house.is_favorited for house in response.context['houses']))
+
+        response = self.client.post(reverse('housing:favorite_toggle'), {'house_id': self.houses[1].pk})
+        self.assertTrue(response.json()['is_favorited'])
+
+        response = self.client.get(url)
+        favorited = [house.pk for house in response.context['houses'] if house.is_favorited]
+        self.assertEqual(favorited, [self.houses[1].pk])
+
+        self.client.post(reverse('housing:favorite_toggle'), {'house_id': self.houses[1].pk})
+        response = self.client.get(url)
+        self.assertFalse(any(house.is_favorited for house in response.context['houses']))
+
+    def test_marking_a_page_costs_at_most_one_query(self):
+        from ..favorites import mark_favorites
+        from ..models import Favorite
+        from django.core.cache import cache
+        cache.clear()
+        Favorite.objects.create(user=self.student, house=self.houses[0])
+        houses = list(House.objects.all())
+        with self.assertNumQueries(1):
+            mark_favorites(houses, self.student)
+        with self.assertNumQueries(0):
+            mark_favorites(houses, self.student)
+        self.assertEqual([house.is_favorited for house in houses], [True, False, False, False])
+
+
+class ListingCardQueryTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from ..models import HouseImage
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        for i in range(6):
+            house = House.objects.create(
+                title=f'House {i}', owner=self.user, location='Bambili', price=100, house_desc='desc'
+            )
+            for j in range(i % 3):
+                HouseImage.objects.create(house=house, image=f'house_images/{i}_{j}.jpg')
+
+    def test_card_projection(self):
+        with self.assertNumQueries(2):  # houses + one prefetch for all images
+            houses = list(House.objects.for_cards().order_by('pk'))
+            for house in houses:
+                self.assertEqual(house.image_count, len(house.images.all()))
+        self.assertEqual([house.image_count for house in houses], [0, 1, 2, 0, 1, 2])
+
+    def test_list_page_query_count_is_constant(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from ..models import HouseImage
+        url = reverse('housing:home')
+        self.client.get(url)  # Warm the card fragments.
+
+        with CaptureQueriesContext(connection) as cached_page:
+            response = self.client.get(url)
+        self.assertEqual(len(cached_page), 2)  # houses, facets: every card came from the fragment cache
+        self.assertIn('house_images/1_0.jpg', response.content.decode())
+
+        for house in House.objects.all():
+            HouseImage.objects.create(house=house, image='house_images/extra.jpg')
+        with CaptureQueriesContext(connection) as rerendered_page:
+            response = self.client.get(url)
+        self.assertEqual(len(rerendered_page), 3)  # + one images prefetch for the changed cards
+        self.assertEqual(response.content.decode().count('house_images/extra.jpg'), 6)
+
+
+class GeoSearchTest(TestCase):
+    # Roughly the university gate in Bambili.
+    GATE = (6.0921, 10.2347)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+
+        def house(title, lat, lng):
+            return House.objects.create(
+                title=title, owner=self.user, location='Bambili', price=100, house_desc='desc',
+                latitude=lat, longitude=lng
+            )
+
+        self.next_door = house('Next door', 6.0925, 10.2349)    # ~50 m
+        self.down_road = house('Down the road', 6.0975, 10.2347)  # ~600 m
+        self.town = house('In town', 6.1300, 10.2347)           # ~4.2 km
+        self.unknown = house('No coordinates', None, None)
+
+    def test_sql_distance_matches_known_distance(self):
+        from ..geo import distance_expression
+        self.town.latitude, self.town.longitude = 1, 0
+        self.town.save()
+        # One degree of latitude is ~111.2 km everywhere.
+        distance = House.objects.filter(pk=self.town.pk).annotate(
+            distance_m=distance_expression(0, 0)
+        ).values_list('distance_m', flat=True).get()
+        self.assertAlmostEqual(distance / 1000, 111.19, places=1)
+
+    def test_radius_filter_and_distance_sort(self):
+        from ..geo import houses_within
+        houses = houses_within(House.objects.all(), *self.GATE, radius_m=800).order_by('distance_m')
+        self.assertEqual(list(houses), [self.next_door, self.down_road])
+        self.assertLess(houses[0].distance_m, 100)
+
+    def test_list_view_near_me(self):
+        response = self.client.get(reverse('housing:home'), {
+            'lat': self.GATE[0], 'lng': self.GATE[1], 'radius': 5000, 'sort': 'distance'
+        })
+        self.assertEqual(list(response.context['houses']), [self.next_door, self.down_road, self.town])
+        self.assertContains(response, 'm away')
+
+
+class MapClusterTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.url = reverse('housing:map-clusters')
+        # Two houses a few meters apart and one in another town.
+        self.a = House.objects.create(title='A', owner=self.user, location='Bambili', price=100,
+                                      house_desc='desc', latitude=6.0921, longitude=10.2347)
+        self.b = House.objects.create(title='B', owner=self.user, location='Bambili', price=300,
+                                      house_desc='desc', latitude=6.0922, longitude=10.2348)
+        self.c = House.objects.create(title='C', owner=self.user, location='Bamenda', price=200,
+                                      house_desc='desc', latitude=5.9597, longitude=10.1460)
+
+    def get(self, zoom, bbox='10.0,5.9,10.4,6.2'):
+        from tasks.queue import work
+        work(burst=True)  # Cells are recounted by the task worker.
+        response = self.client.get(self.url, {'zoom': zoom, 'bbox': bbox})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_clusters_follow_saves_and_deletes(self):
+        markers = sorted(self.get(10)['clusters'], key=lambda m: m['count'])
+        self.assertEqual([m['count'] for m in markers], [1, 2])
+        self.assertEqual((markers[1]['min_price'], markers[1]['max_price']), (100.0, 300.0))
+        self.assertEqual(markers[0]['house_id'], self.c.pk)
+
+        self.b.latitude, self.b.longitude = 5.9598, 10.1461  # Move B next to C.
+        self.b.save()
+        self.assertEqual(sorted(m['count'] for m in self.get(10)['clusters']), [1, 2])
+
+        self.c.delete()
+        self.b.delete()
+        markers = self.get(10)['clusters']
+        self.assertEqual([(m['count'], m['house_id']) for m in markers], [(1, self.a.pk)])
+
+    def test_rebuild_matches_incremental(self):
+        from ..clusters import rebuild_clusters
+        before = self.get(14)['clusters']
+        rebuild_clusters()
+        after = self.get(14)['clusters']
+        key = lambda m: (m['lat'], m['lng'])
+        self.assertEqual(sorted(before, key=key), sorted(after, key=key))
+
+    def test_houses_on_cell_edges_are_counted_once_in_their_cell(self):
+        from tasks.queue import work
+        from ..clusters import MAX_CLUSTER_ZOOM, cell_bounds, cell_for, cells_per_axis, rebuild_clusters
+        from ..models import HouseMapCluster
+        south, north, west, east = cell_bounds(5, 3, 3)
+        for lat, lng in ((north, west), (south, east), (89.9, 180.0), (-89.9, -180.0)):  # Edges, past the clamp.
+            House.objects.create(title='Edge', owner=self.user, location='Far', price=50,
+                                 house_desc='desc', latitude=lat, longitude=lng)
+        self.assertEqual(cell_for(north, west, 3), (5, 2))  # The north edge belongs to the cell above.
+        self.assertEqual(cell_for(89.9, 180.0, 3), (cells_per_axis(3) - 1, 0))
+        work(burst=True)
+
+        def snapshot():
+            return sorted(HouseMapCluster.objects.values_list('zoom', 'x', 'y', 'count'))
+
+        incremental = snapshot()
+        for zoom in range(MAX_CLUSTER_ZOOM + 1):
+            self.assertEqual(sum(count for z, _, _, count in incremental if z == zoom), House.objects.count())
+        rebuild_clusters()
+        self.assertEqual(incremental, snapshot())
+
+    def test_payload_is_bounded(self):
+        from ..clusters import MAX_MARKERS
+        data = self.get(16, bbox='-180,-85,180,85')  # The whole world at street zoom.
+        self.assertLess(data['zoom'], 16)
+        self.assertLessEqual(len(data['clusters']), MAX_MARKERS)
+        self.assertEqual(sum(m['count'] for m in data['clusters']), 3)
+
+    def test_bad_bbox(self):
+        for bbox in ('nope', 'nan,0,10,10', '0,0,inf,10'):
+            response = self.client.get(self.url, {'zoom': 3, 'bbox': bbox})
+            self.assertEqual(response.status_code, 400)
+
+    def test_edits_that_keep_position_and_price_queue_nothing(self):
+        from tasks.models import Task
+        self.get(10)
+        self.a.title = 'A, repainted'
+        self.a.save()
+        self.assertFalse(Task.objects.filter(name='housing.tasks.refresh_map_cells', status=Task.PENDING).exists())
+        self.a.price = 150
+        self.a.save()
+        self.assertTrue(Task.objects.filter(name='housing.tasks.refresh_map_cells', status=Task.PENDING).exists())
+
+
+class ViewCounterTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.house = House.objects.create(title='Studio', owner=self.user, location='Bambili',
+                                          price=100, house_desc='desc')
+        self.other = House.objects.create(title='Room', owner=self.user, location='Bambili',
+                                          price=50, house_desc='desc')
+        self.url = reverse('housing:house-detail', args=[self.house.pk])
+
+    def test_detail_view_does_not_write(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+
+    def test_flush_applies_buffered_views(self):
+        from ..counters import record_view
+        for _ in range(3):
+            self.client.get(self.url)
+        record_view(self.other.pk)
+        self.house.refresh_from_db()
+        self.assertEqual(self.house.view_count, 0)
+
+        self.assertEqual(flush_buffered_views(), 4)
+        self.house.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.house.view_count, self.other.view_count), (3, 1))
+
+        self.assertEqual(flush_buffered_views(), 0)  # Nothing is applied twice.
+
+    def test_views_are_still_counted_after_the_generation_key_expired(self):
+        from django.core.cache import cache
+        from .. import counters
+        cache.set('house_views:flushed', 5000, None)  # Days of flushes every 30s.
+        cache.set('house_views:gen', 5002, None)
+        cache.delete('house_views:gen')  # Expired, or evicted.
+        self.client.get(self.url)
+        counters.record_view(self.other.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(flush_buffered_views(), 2)
+        self.assertGreaterEqual(cache.get('house_views:gen'), 5002)
+        self.house.refresh_from_db()
+        self.assertEqual(self.house.view_count, 1)
+
+    def test_failed_flush_keeps_the_views_for_the_next_one(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from .. import counters
+        counters.record_view(self.house.pk)
+        counters.flush_view_counts()  # Closes the generation holding the view.
+        with mock.patch.object(counters, 'log_views', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                counters.flush_view_counts()
+        self.assertEqual(counters.flush_view_counts(), 1)
+        self.house.refresh_from_db()
+        self.assertEqual(self.house.view_count, 1)
+
+
+class ViewAnalyticsTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.house = House.objects.create(title='Studio', owner=self.user, location='Bambili',
+                                          price=100, house_desc='desc')
+
+    def test_batches_roll_up_incrementally(self):
+        import datetime
+        from django.utils import timezone
+        from ..analytics import house_views, log_views
+        from ..models import HouseViewRollup, ViewLog
+        morning = timezone.now().replace(hour=9, minute=15, second=0, microsecond=0)
+        log_views([(self.house.pk, self.user.pk, '10.0.0.1', morning),
+                   (self.house.pk, None, '10.0.0.2', morning + datetime.timedelta(minutes=10))])
+        log_views([(self.house.pk, None, '10.0.0.3', morning + datetime.timedelta(hours=2))])
+
+        self.assertEqual(ViewLog.objects.count(), 3)
+        hours = house_views(self.house.pk, HouseViewRollup.HOUR)
+        self.assertEqual([views for _, views in hours], [2, 1])
+        self.assertEqual(hours[0][0], morning.replace(minute=0))
+        self.assertEqual(house_views(self.house.pk), [(morning.replace(hour=0, minute=0), 3)])
+
+    def test_prune_keeps_rollups(self):
+        import datetime
+        from django.utils import timezone
+        from ..analytics import house_views, log_views, prune_view_logs
+        from ..models import ViewLog
+        old = timezone.now() - datetime.timedelta(days=120)
+        log_views([(self.house.pk, None, None, old), (self.house.pk, None, None, timezone.now())])
+
+        self.assertEqual(prune_view_logs(days=90), 1)
+        self.assertEqual(ViewLog.objects.count(), 1)
+        self.assertEqual(sum(views for _, views in house_views(self.house.pk)), 2)
+
+    def test_owner_sees_weekly_views_from_rollups(self):
+        self.client.login(username='landlord', password='testpass123')
+        url = reverse('housing:house-detail', args=[self.house.pk])
+        self.client.get(url)
+        flush_buffered_views()
+        response = self.client.get(url)
+        self.assertEqual(response.context['views_last_week'], 1)
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.old_hit = House.objects.create(title='Old hit', owner=self.user, location='Bambili',
+                                            price=100, house_desc='desc')
+        self.new_hit = House.objects.create(title='New hit', owner=self.user, location='Bambili',
+                                            price=100, house_desc='desc')
+
+    def test_recent_interest_beats_old_interest(self):
+        import datetime
+        from django.utils import timezone
+        from ..analytics import log_views
+        from ..trending import rebuild_trending_scores, trending_houses
+        now = timezone.now()
+        month_ago = now - datetime.timedelta(days=30)
+        # Twenty views a month ago against three today: ten half-lives of decay make the old ones worth less.
+        log_views([(self.old_hit.pk, None, None, month_ago)] * 20 + [(self.new_hit.pk, None, None, now)] * 3)
+        rebuild_trending_scores()
+        self.assertEqual(list(trending_houses(limit=2)), [self.new_hit, self.old_hit])
+
+    def test_scores_do_not_overflow_decades_ahead(self):
+        import datetime
+        from unittest import mock
+        from .. import trending
+        far = trending.EPOCH + datetime.timedelta(days=365 * 100)
+        with mock.patch.object(trending, 'HALF_LIFE', datetime.timedelta(hours=12)):  # 2 ** 73000 as a plain sum.
+            late, later = trending.event_points(far), trending.event_points(far + datetime.timedelta(hours=12))
+            twice = trending.combine(late, late)
+        self.assertAlmostEqual(twice, late + 1)  # Two views are worth one view a half-life later.
+        self.assertAlmostEqual(later, late + 1)
+
+        trending.add_points({self.old_hit.pk: late, self.new_hit.pk: late})
+        trending.add_points({self.old_hit.pk: late})
+        self.old_hit.refresh_from_db()
+        self.assertAlmostEqual(self.old_hit.trending_score, twice)
+        self.assertEqual(list(trending.trending_houses(limit=2)), [self.old_hit, self.new_hit])
+
+    def test_scores_at_or_before_the_epoch_still_count_as_interest(self):
+        import datetime
+        from .. import trending
+        quiet = House.objects.create(title='Quiet', owner=self.user, location='Bambili', price=100, house_desc='desc')
+        quiet.refresh_from_db()
+        self.assertEqual(quiet.trending_score, trending.NO_INTEREST)
+        at_epoch = trending.event_points(trending.EPOCH)
+        self.assertEqual(at_epoch, 0.0)
+        trending.add_points({self.old_hit.pk: at_epoch})
+        trending.add_points({self.old_hit.pk: at_epoch})  # Added to, not taken for "no interest".
+        trending.add_points({self.new_hit.pk: trending.event_points(trending.EPOCH - datetime.timedelta(days=30))})
+        self.old_hit.refresh_from_db()
+        self.assertAlmostEqual(self.old_hit.trending_score, 1.0)
+        self.assertEqual(list(trending.trending_houses(limit=3)), [self.old_hit, self.new_hit, quiet])
+
+    def test_flush_and_favorites_update_scores_incrementally(self):
+        from ..counters import record_view
+        from ..models import Favorite
+        from ..trending import trending_houses
+        record_view(self.old_hit.pk)
+        record_view(self.old_hit.pk)
+        flush_buffered_views()
+        self.assertEqual(list(trending_houses(limit=1)), [self.old_hit])
+
+        Favorite.objects.create(user=self.user, house=self.new_hit)  # Worth more than two views.
+        self.assertEqual(list(trending_houses(limit=1)), [self.new_hit])
+
+
+class HouseDetailQueryTest(TestCase):
+    def setUp(self):
+        from ..models import HouseImage, HouseReview
+        self.owner = User.objects.create_user(username='landlord', password='testpass123')
+        self.house = House.objects.create(title='Studio', owner=self.owner, location='Bambili',
+                                          price=100, house_desc='desc')
+        self.url = reverse('housing:house-detail', args=[self.house.pk])
+        self.add_content(HouseImage, HouseReview, 2)
+
+    def add_content(self, image_model, review_model, count):
+        for i in range(count):
+            image_model.objects.create(house=self.house, image=f'house_images/{self.house.pk}-{i}.jpg')
+            author = User.objects.create_user(username=f'tenant{image_model.objects.count()}', password='x')
+            review_model.objects.create(house=self.house, author=author, comment='Nice', rating=4)
+
+    def test_query_count_does_not_grow_with_reviews_and_images(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from ..models import HouseImage, HouseReview
+        self.client.get(self.url)  # Warm up the caches.
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['reviews']), 2)
+
+        self.add_content(HouseImage, HouseReview, 5)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['reviews']), 6)  # First page only
+        self.assertEqual(len(large), len(small))
+        # ETag lookup, house + owner + profile, images, first review page + authors. Anonymous, so no session query.
+        self.assertEqual(len(large), 4)
+
+
+class ReviewPaginationTest(TestCase):
+    def setUp(self):
+        import datetime
+        from django.utils import timezone
+        from ..models import HouseReview
+        self.owner = User.objects.create_user(username='landlord', password='testpass123')
+        self.house = House.objects.create(title='Studio', owner=self.owner, location='Bambili',
+                                          price=100, house_desc='desc')
+        start = timezone.now()
+        # Two reviews per timestamp so the id tie-breaker matters.
+        for i in range(14):
+            HouseReview.objects.create(house=self.house, author=self.owner, comment=f'Review {i}', rating=4,
+                                       reviewed_on=start + datetime.timedelta(minutes=i // 2))
+        self.expected = list(HouseReview.objects.order_by('-reviewed_on', '-pk').values_list('comment', flat=True))
+
+    def test_load_more_walks_every_review_once(self):
+        response = self.client.get(reverse('housing:house-detail', args=[self.house.pk]))
+        first = response.context['reviews']
+        seen = [review.comment for review in first]
+        cursor = first.next_cursor
+        url = reverse('housing:house-reviews', args=[self.house.pk])
+        while cursor:
+            data = self.client.get(url, {'cursor': cursor}).json()
+            seen += [comment for comment in self.expected if f'>{comment}<' in data['html']]
+            cursor = data['next_cursor']
+        self.assertEqual(seen, self.expected)
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('housing:house-reviews', args=[self.house.pk]), {'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RatingAggregateTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='landlord', password='testpass123')
+        self.tenant = User.objects.create_user(username='tenant', password='testpass123')
+        self.house = House.objects.create(title='Studio', owner=self.owner, location='Bambili',
+                                          price=100, house_desc='desc')
+
+    def aggregates(self):
+        self.house.refresh_from_db()
+        return self.house.review_count, self.house.rating_sum, self.house.rating_average
+
+    def test_form_create_edit_and_delete_keep_aggregates_in_sync(self):
+        from ..models import HouseReview
+        self.client.login(username='tenant', password='testpass123')
+        self.client.post(reverse('housing:house-review', args=[self.house.pk]), {'rating': '4', 'comment': 'Good'})
+        other = HouseReview.objects.create(house=self.house, author=self.owner, comment='Ok', rating=2)
+        self.assertEqual(self.aggregates(), (2, 6, 3.0))
+        self.assertEqual(dict(self.house.rating_histogram), {5: 0, 4: 1, 3: 0, 2: 1, 1: 0})
+
+        other.rating = 5
+        other.save()
+        self.assertEqual(self.aggregates(), (2, 9, 4.5))
+        self.assertEqual(self.house.rating_2_count, 0)
+
+        other.delete()
+        self.assertEqual(self.aggregates(), (1, 4, 4.0))
+        HouseReview.objects.all().delete()
+        self.assertEqual(self.aggregates(), (0, 0, 0.0))
+
+    def test_editing_the_house_keeps_counters_updated_meanwhile(self):
+        from unittest import mock
+        from ..models import HouseReview
+        from ..views import HouseDetailEditView
+        stale = House.objects.get(pk=self.house.pk)  # Loaded before the review, as a slow form post would.
+        HouseReview.objects.create(house=self.house, author=self.tenant, comment='Good', rating=4)
+        House.objects.filter(pk=self.house.pk).update(view_count=7)
+        self.client.login(username='landlord', password='testpass123')
+        with mock.patch.object(HouseDetailEditView, 'get_object', return_value=stale):
+            response = self.client.post(reverse('housing:edit-house-details', args=[self.house.pk]), {
+                'title': 'Renovated studio', 'location': 'Bambili', 'price': '100', 'house_desc': 'desc',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.aggregates(), (1, 4, 4.0))
+        self.assertEqual((self.house.title, self.house.view_count), ('Renovated studio', 7))
+
+    def test_rebuild_and_best_rated_sort(self):
+        from ..models import HouseReview
+        from ..ratings import rebuild_rating_aggregates
+        villa = House.objects.create(title='Villa', owner=self.owner, location='Bambili',
+                                     price=500, house_desc='desc')
+        HouseReview.objects.create(house=self.house, author=self.tenant, comment='Meh', rating=3)
+        HouseReview.objects.create(house=villa, author=self.tenant, comment='Great', rating=5)
+        House.objects.update(review_count=0, rating_sum=0, rating_average=0)  # Drift
+
+        self.assertEqual(rebuild_rating_aggregates(), 2)
+        self.assertEqual(self.aggregates(), (1, 3, 3.0))
+        response = self.client.get(reverse('housing:home'), {'sort': 'best_rated'})
+        self.assertEqual(list(response.context['houses']), [villa, self.house])
+
+
+class QueryCacheTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):  # TestCase never commits, run the version bumps.
+            self.houses = [House.objects.create(title=f'House {i}', owner=self.user, location='Bambili',
+                                                price=100 + i, house_desc='desc') for i in range(3)]
+
+    def test_hit_hydrates_ids_in_order(self):
+        from ..querycache import cached_queryset
+        qs = House.objects.for_cards().order_by('-price')[:2]
+        first = cached_queryset(qs)
+        with self.assertNumQueries(2):  # pk IN (...) + the images prefetch, no ORDER BY/LIMIT scan
+            second = cached_queryset(qs)
+        self.assertEqual(second, first)
+        self.assertEqual(second, [self.houses[2], self.houses[1]])
+        self.assertTrue(hasattr(second[0], 'image_count'))
+
+    def test_writes_invalidate_once_per_transaction(self):
+        from django.db import transaction
+        from ..querycache import cached_queryset, table_version
+        qs = House.objects.order_by('-price')[:1]
+        self.assertEqual(cached_queryset(qs), [self.houses[2]])
+        version = table_version(House)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for house in self.houses:
+                    house.price = 1000 - house.price
+                    house.save()
+        self.assertEqual(table_version(House), version + 1)
+        self.assertEqual(cached_queryset(qs), [self.houses[0]])
+
+    def test_counter_only_saves_do_not_invalidate(self):
+        from ..querycache import table_version
+        version = table_version(House)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.houses[0].save(update_fields=['view_count'])
+        self.assertEqual(table_version(House), version)
+
+
+class CardFragmentTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        self.house = House.objects.create(title='Studio', owner=self.user, location='Bambili',
+                                          price=100, house_desc='desc')
+
+    def test_card_follows_edits_and_reviews_but_not_the_viewer(self):
+        from ..models import Favorite, HouseReview
+        url = reverse('housing:home')
+        self.assertIn('$100', self.client.get(url).content.decode())
+
+        self.house.price = 250
+        self.house.save()
+        HouseReview.objects.create(house=self.house, author=self.user, comment='Good', rating=4)
+        page = self.client.get(url).content.decode()
+        self.assertIn('$250', page)
+        self.assertIn('4.0', page)
+
+        # The heart is rendered per viewer around the cached card.
+        Favorite.objects.create(user=self.user, house=self.house)
+        self.client.login(username='landlord', password='testpass123')
+        self.assertIn('data-favorited="true"', self.client.get(url).content.decode())
+        self.client.logout()
+        self.assertIn('data-favorited="false"', self.client.get(url).content.decode())
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        with self.captureOnCommitCallbacks(execute=True):  # TestCase never commits, run the version bumps.
+            self.house = House.objects.create(title='Studio', owner=self.user, location='Bambili',
+                                              price=100, house_desc='desc')
+        self.url = reverse('housing:house-detail', kwargs={'pk': self.house.pk})
+
+    def test_detail_revalidates_with_one_query(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(1):  # updated_at by primary key, nothing rendered
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_reviews_and_images_change_the_detail_etag(self):
+        from ..models import HouseImage, HouseReview
+        etag = self.client.get(self.url)['ETag']
+        HouseReview.objects.create(house=self.house, author=self.user, comment='Good', rating=4)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        HouseImage.objects.create(house=self.house, image='house_images/a.jpg')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_owner_phone_number_changes_the_detail_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        profile = self.user.profile
+        profile.phone_number = '+237670000000'
+        profile.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '+237670000000')
+
+    def test_pending_messages_are_never_answered_with_304(self):
+        self.client.login(username='landlord', password='testpass123')
+        home = reverse('housing:home')
+        etag = self.client.get(home)['ETag']
+        # Nothing commits in a TestCase, so the list's table versions and its ETag stay the same.
+        response = self.client.post(reverse('housing:edit-house-details', args=[self.house.pk]), {
+            'title': 'Sunny studio', 'location': 'Bambili', 'price': '100', 'house_desc': 'desc',
+        })
+        self.assertRedirects(response, home, fetch_redirect_response=False)
+        response = self.client.get(home, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'House details updated successfully.')
+        self.assertEqual(self.client.get(home, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_detail_etag_depends_on_the_viewer(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username='landlord', password='testpass123')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_list_revalidates_without_queries(self):
+        url = reverse('housing:home') + '?sort=price'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url + '&min_price=50', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.house.price = 250
+            self.house.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ImagePipelineTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.core.cache import cache
+        from django.test import override_settings
+        cache.clear()
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.house = House.objects.create(title='Studio', owner=self.user, location='Bambili',
+                                          price=100, house_desc='desc')
+
+    def upload(self):
+        """A 2000x1000 phone photo taken sideways (EXIF orientation 6) with a camera model in its metadata."""
+        import io
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from ..models import HouseImage
+        photo = Image.new('RGB', (2000, 1000), 'red')
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90° clockwise to display
+        exif[0x0110] = 'Phone'  # Model
+        data = io.BytesIO()
+        photo.save(data, 'JPEG', exif=exif)
+        return HouseImage.objects.create(house=self.house, image=SimpleUploadedFile('p.jpg', data.getvalue()))
+
+    def test_variants_are_upright_resized_and_stripped(self):
+        from PIL import Image
+        from ..images import process_image
+        image = self.upload()
+        self.assertFalse(image.variants_ready)
+        process_image(image)
+        image.refresh_from_db()
+
+        self.assertTrue(image.variants_ready)
+        jpegs = [v for v in image.variants if v['format'] == 'jpg']
+        # Portrait once rotated, never upscaled past the original's 1000px width.
+        self.assertEqual([(v['width'], v['height']) for v in jpegs], [(320, 640), (640, 1280), (1000, 2000)])
+        self.assertEqual({v['format'] for v in image.variants}, {'jpg', 'webp'})
+        with Image.open(image.image.storage.path(jpegs[0]['name'])) as variant:
+            self.assertEqual(variant.size, (320, 640))
+            self.assertEqual(len(variant.getexif()), 0)
+
+    def test_uploads_are_processed_by_the_worker(self):
+        from tasks.queue import work
+        image = self.upload()
+        self.assertFalse(image.variants_ready)
+        work(burst=True)
+        image.refresh_from_db()
+        self.assertTrue(image.variants_ready)
+
+    def test_cards_get_a_srcset_once_processed(self):
+        from ..images import process_image
+        image = self.upload()
+        page = self.client.get(reverse('housing:home')).content.decode()
+        self.assertIn(image.image.url, page)
+        self.assertNotIn('srcset', page)
+
+        process_image(image)
+        page = self.client.get(reverse('housing:home')).content.decode()
+        self.assertIn('type="image/webp"', page)
+        self.assertIn('-320.webp 320w', page)
+        self.assertNotIn(f'src="{image.image.url}"', page)
+
+
+class ChunkedUploadTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from unittest import mock
+        from django.test import override_settings
+        from .. import uploads
+        self.user = User.objects.create_user(username='landlord', password='testpass123')
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        chunk_size = mock.patch.object(uploads, 'CHUNK_SIZE', 4)
+        chunk_size.start()
+        self.addCleanup(chunk_size.stop)
+        self.house = House.objects.create(title='Studio', owner=self.user, location='Bambili',
+                                          price=100, house_desc='desc')
+        self.client.login(username='landlord', password='testpass123')
+
+    def start(self, data, kind='video'):
+        import hashlib
+        response = self.client.post(
+            reverse('housing:house-uploads', args=[self.house.pk]), content_type='application/json',
+            data={'kind': kind, 'filename': 'tour.mp4', 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest()},
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['url']
+
+    def put(self, url, offset, chunk, **headers):
+        return self.client.put(url, chunk, content_type='application/octet-stream',
+                               headers={'Upload-Offset': str(offset), **headers})
+
+    def test_chunks_resume_and_attach_the_video(self):
+        data = b'0123456789'
+        url = self.start(data)
+        self.assertEqual(self.put(url, 0, data[:4]).json()['offset'], 4)
+
+        # The connection dropped before the answer: the client asks where to resume.
+        self.assertEqual(self.client.get(url).json()['offset'], 4)
+        response = self.put(url, 0, data[:4])  # Replaying an acknowledged chunk is refused, with the offset.
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4))
+
+        self.put(url, 4, data[4:8])
+        response = self.put(url, 8, data[8:])
+        self.assertEqual(response.status_code, 201)
+        self.house.refresh_from_db()
+        with self.house.video.open('rb') as video:
+            self.assertEqual(video.read(), data)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_checksums_are_verified(self):
+        import hashlib
+        url = self.start(b'abcdef')
+        response = self.put(url, 0, b'abcd', **{'Upload-Checksum': hashlib.sha256(b'abcX').hexdigest()})
+        self.assertEqual((response.status_code, response.json()['offset']), (422, 0))
+
+        self.put(url, 0, b'abcd')
+        response = self.put(url, 4, b'eX')  # Corrupted without a chunk checksum: the file's catches it.
+        self.assertEqual((response.status_code, response.json()['offset']), (422, 0))
+        self.house.refresh_from_db()
+        self.assertFalse(self.house.video)
+
+    def test_images_become_house_images(self):
+        import io
+        from PIL import Image
+        from tasks.models import Task
+        data = io.BytesIO()
+        Image.new('RGB', (40, 30), 'blue').save(data, 'JPEG')
+        data = data.getvalue()
+        url = self.start(data, kind='image')
+        for offset in range(0, len(data), 4):
+            response = self.put(url, offset, data[offset:offset + 4])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.house.images.count(), 1)
+        self.assertTrue(Task.objects.filter(name='housing.tasks.make_image_variants').exists())
+
+    def test_only_the_owner_uploads(self):
+        url = self.start(b'abcd')
+        User.objects.create_user(username='tenant', password='testpass123')
+        self.client.login(username='tenant', password='testpass123')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        response = self.client.post(reverse('housing:house-uploads', args=[self.house.pk]),
+                                    content_type='application/json', data={})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,90 @@
+"""
+Trending score for houses: recent views and favorites count most, older ones fade out exponentially.
+
+The decayed score at time ``now`` would be ``sum(weight * 2 ** -((now - t) / HALF_LIFE))`` over all
+events. Decaying every row all the time is too expensive, so the stored value is that sum scaled by
+``2 ** ((now - EPOCH) / HALF_LIFE)``: the scale factor is the same for every house at a given
+moment, so ordering by the stored column gives the same ranking as the decayed score.
+
+That scaled sum doubles every HALF_LIFE and would overflow a float within a few years, so the
+column holds its base-2 logarithm instead. One event is worth ``log2(weight) + (t - EPOCH) / HALF_LIFE``,
+which only grows linearly with time, and sums become ``combine(a, b) = log2(2 ** a + 2 ** b)``,
+computed as ``max + log2(1 + 2 ** (min - max))`` so nothing ever overflows. A log2 score can be
+any real number (0.0 for one view at EPOCH, negative before it), so "no interest yet" is -inf: it
+never collides with a score and sorts below all of them, in a descending index scan as in a
+keyset cursor. Events are added incrementally (UPDATEs, no re-reads), and the indexed
+House.trending_score column makes "top N trending" an index scan.
+"""
+import datetime
+import math
+
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Greatest, Least, Log, Power
+
+from .models import Favorite, House, ViewLog
+
+HALF_LIFE = datetime.timedelta(hours=getattr(settings, "TRENDING_HALF_LIFE_HOURS", 72))
+EPOCH = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+VIEW_WEIGHT = 1.0
+FAVORITE_WEIGHT = 5.0  # A favorite says more about interest than a page view.
+NO_INTEREST = float("-inf")  # log2 of a zero score, see the module docstring.
+
+
+def event_points(timestamp, weight=VIEW_WEIGHT):
+    """What one event at timestamp is worth, in the log2 space of the stored score."""
+    return math.log2(weight) + (timestamp - EPOCH) / HALF_LIFE
+
+
+def combine(total, points):
+    """Add points to total, both in log2 space. total None (nothing yet) returns points."""
+    if total is None:
+        return points
+    high, low = max(total, points), min(total, points)
+    return high + math.log2(1.0 + 2.0 ** (low - high))
+
+
+def add_points(points):
+    """
+    Add points to the stored scores of several houses in one UPDATE.
+    :param points: Dict of house_id -> points (see event_points and combine).
+    """
+    if not points:
+        return
+    score = F("trending_score")
+    added = Case(
+        *[When(pk=house_id, then=Value(value)) for house_id, value in points.items()],
+        output_field=FloatField(),
+    )
+    House.objects.filter(pk__in=points).update(
+        trending_score=Case(
+            When(trending_score=NO_INTEREST, then=added),
+            default=Greatest(score, added) + Log(2.0, 1.0 + Power(2.0, Least(score, added) - Greatest(score, added))),
+            output_field=FloatField(),
+        )
+    )
+
+
+def trending_houses(queryset=None, limit=10):
+    """The limit highest-scoring houses, read straight off the trending_score index."""
+    queryset = House.objects.all() if queryset is None else queryset
+    return queryset.order_by("-trending_score", "-pk")[:limit]
+
+
+def rebuild_trending_scores():
+    """
+    Recompute every score from the stored events (ViewLog and Favorite), e.g. after a data import.
+    Views older than the ViewLog retention window are gone, but they would have decayed to ~0 anyway.
+    :return: Number of houses with a score.
+    """
+    points = {}
+    for house_id, timestamp in ViewLog.objects.values_list("house_id", "timestamp").iterator():
+        points[house_id] = combine(points.get(house_id), event_points(timestamp))
+    for house_id, timestamp in Favorite.objects.values_list("house_id", "favorited_at").iterator():
+        points[house_id] = combine(points.get(house_id), event_points(timestamp, FAVORITE_WEIGHT))
+
+    House.objects.update(trending_score=NO_INTEREST)
+    house_ids = list(points)
+    for start in range(0, len(house_ids), 500):  # Keep each CASE statement a reasonable size.
+        add_points({house_id: points[house_id] for house_id in house_ids[start:start + 500]})
+    return len(points)
@@ -0,0 +1,188 @@
+"""
+Chunked, resumable uploads of house videos and images.
+
+The house form posted the video with everything else in one multipart request: Django buffered
+all of it and a dropped connection lost all of it. Large files now go through a small protocol
+instead (see the HouseUpload*View views):
+
+1. ``POST /housing/house/<pk>/uploads/`` with {"kind", "filename", "size", "sha256"} starts an
+   upload and returns its URL, offset (0) and chunk_size.
+2. ``PUT <url>`` with the ``Upload-Offset`` header and chunk_size raw bytes as body, the last chunk
+   shorter, appends one chunk. An optional ``Upload-Checksum`` header (SHA-256 of the chunk) lets
+   a corrupted chunk be refused before it is acknowledged. Every answer carries the new offset.
+3. After an interruption, ``GET <url>`` returns the last acknowledged offset to resume from.
+4. Once the last chunk is in, the whole file is checked against the announced SHA-256 and attached
+   to the house: it replaces House.video, or becomes a new HouseImage (which then gets its variants
+   from housing.images). ``DELETE <url>`` abandons an upload.
+
+Chunks are streamed from the request to ``<MEDIA_ROOT>/partial_uploads/<id>.part`` in blocks of
+BLOCK_SIZE bytes and the checksum is computed the same way, so memory stays bounded whatever the
+file size. Uploads left untouched for HOUSE_UPLOAD_EXPIRY seconds are purged by housing.tasks.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .models import HouseImage, HouseUpload
+
+CHUNK_SIZE = getattr(settings, "HOUSE_UPLOAD_CHUNK_SIZE", 1024 * 1024)
+MAX_SIZES = {
+    HouseUpload.VIDEO: getattr(settings, "HOUSE_VIDEO_MAX_SIZE", 500 * 1024 * 1024),
+    HouseUpload.IMAGE: getattr(settings, "HOUSE_IMAGE_MAX_SIZE", 20 * 1024 * 1024),
+}
+EXPIRY = getattr(settings, "HOUSE_UPLOAD_EXPIRY", 60 * 60 * 24)
+BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A request the upload cannot accept. status is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def partial_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, "partial_uploads", f"{upload.pk}.part")
+
+
+def chunk_length(upload):
+    """Exact length of the next chunk: CHUNK_SIZE, or what is left for the last one."""
+    return min(CHUNK_SIZE, upload.size - upload.offset)
+
+
+def upload_state(upload):
+    return {"id": str(upload.pk), "offset": upload.offset, "size": upload.size, "chunk_size": CHUNK_SIZE}
+
+
+def start_upload(house, owner, kind, filename, size, sha256):
+    """
+    Start an upload, with an empty partial file.
+    :param house: The house the file is for, owned by owner.
+    :param kind: HouseUpload.VIDEO or HouseUpload.IMAGE.
+    :param filename: Name of the file, used for the stored copy.
+    :param size: Total size in bytes.
+    :param sha256: Hex SHA-256 of the whole file.
+    :return: The new HouseUpload.
+    """
+    if kind not in MAX_SIZES:
+        raise UploadError(f"kind must be one of {', '.join(MAX_SIZES)}.")
+    if not isinstance(size, int) or not 0 < size <= MAX_SIZES[kind]:
+        raise UploadError(f"size must be between 1 and {MAX_SIZES[kind]} bytes.")
+    sha256 = str(sha256).lower()
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise UploadError("sha256 must be the hex SHA-256 of the file.")
+    filename = os.path.basename(str(filename or "")).strip()
+    if not filename:
+        raise UploadError("filename is required.")
+
+    upload = HouseUpload.objects.create(
+        house=house, owner=owner, kind=kind, filename=filename[:255], size=size, sha256=sha256
+    )
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return upload
+
+
+def receive_chunk(upload, offset, stream, length, checksum=None):
+    """
+    Write one chunk at offset and acknowledge it, attaching the file once it is complete.
+    :param offset: Where the client says the chunk starts, must be the acknowledged offset.
+    :param stream: File-like object the chunk is read from (the request), length bytes of it.
+    :param checksum: Optional hex SHA-256 of the chunk.
+    :return: The attached House or HouseImage after the last chunk, else None.
+    """
+    if offset != upload.offset:
+        raise UploadError(f"Expected offset {upload.offset}.", status=409)
+    if length != chunk_length(upload):
+        raise UploadError(f"Chunk must be {chunk_length(upload)} bytes.")
+
+    digest = hashlib.sha256()
+    with open(partial_path(upload), "r+b") as out:
+        out.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                raise UploadError("Chunk ended early.")
+            out.write(block)
+            digest.update(block)
+            remaining -= len(block)
+        out.flush()
+        os.fsync(out.fileno())  # Acknowledged bytes must survive a crash.
+    if checksum is not None and checksum.lower() != digest.hexdigest():
+        raise UploadError("Chunk checksum mismatch, send it again.", status=422)
+
+    # Conditional, so two requests sending the same chunk cannot both move the offset.
+    if not HouseUpload.objects.filter(pk=upload.pk, offset=offset).update(
+        offset=offset + length, updated_at=timezone.now()
+    ):
+        raise UploadError("Chunk already received.", status=409)
+    upload.offset = offset + length
+    return finish_upload(upload) if upload.offset == upload.size else None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as data:
+        for block in iter(lambda: data.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finish_upload(upload):
+    """Verify the complete file and attach it to the house. A mismatch restarts the upload from 0."""
+    path = partial_path(upload)
+    if file_sha256(path) != upload.sha256:
+        with open(path, "r+b") as partial:
+            partial.truncate(0)
+        HouseUpload.objects.filter(pk=upload.pk).update(offset=0, updated_at=timezone.now())
+        upload.offset = 0
+        raise UploadError("File checksum mismatch, upload it again from offset 0.", status=422)
+    if upload.kind == HouseUpload.IMAGE:
+        try:
+            with Image.open(path) as img:
+                img.verify()
+        except Exception:
+            abort_upload(upload)
+            raise UploadError("Not an image.", status=422)
+
+    with open(path, "rb") as data, transaction.atomic():
+        # The storage copies File objects chunk by chunk.
+        if upload.kind == HouseUpload.VIDEO:
+            attached = upload.house
+            attached.video.save(upload.filename, File(data), save=False)
+            attached.save(update_fields=["video", "updated_at"])
+        else:
+            attached = HouseImage(house=upload.house)
+            attached.image.save(upload.filename, File(data), save=False)
+            attached.save()
+        upload.delete()
+    os.remove(path)
+    return attached
+
+
+def abort_upload(upload):
+    path = partial_path(upload)  # Before delete(), which clears the pk.
+    upload.delete()
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads(seconds=EXPIRY):
+    """Abandon the uploads that received nothing for seconds. Returns how many."""
+    stale = HouseUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=seconds))
+    count = 0
+    for upload in stale:
+        abort_upload(upload)
+        count += 1
+    return count
@@ -12,8 +12,12 @@ urlpatterns = [
 
     path("house/<int:pk>/", views.HouseDetailView.as_view(), name="house-detail"),
     path("house/<int:pk>/review/", views.ReviewCreateReview.as_view(), name="house-review"),
+    path("house/<int:pk>/reviews/", views.house_reviews, name="house-reviews"),
+    path("house/<int:pk>/uploads/", views.HouseUploadStartView.as_view(), name="house-uploads"),
+    path("uploads/<uuid:upload_id>/", views.HouseUploadView.as_view(), name="house-upload"),
     # path("favorites/add/<int:house_id>/", views.add_favorite, name="add_favorite"),
     # path("favorites/remove/<int:house_id>/", views.remove_favorite, name="remove_favorite"),
     path("favorites/", views.FavouriteListView.as_view(), name="favorites"),
     path("favorite-toggle/", views.toggle_favorite, name="favorite_toggle"),
+    path("map/clusters/", views.map_clusters, name="map-clusters"),
 ]
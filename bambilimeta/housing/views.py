@@ -1,10 +1,16 @@
+import datetime
+import json
+import math
+
 from django.forms import BaseModelForm
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.core.paginator import InvalidPage
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.views.generic import ListView, CreateView, DetailView, View
-from django.urls import reverse_lazy
-from .models import House, HouseImage, HouseReview, Favorite
-from .forms import HouseForm, HouseImageFormSet, HouseReviewForm
+from django.urls import reverse, reverse_lazy
+from .models import House, HouseImage, HouseReview, HouseUpload, Favorite
+from .forms import HouseForm, HouseImageFormSet, HouseReviewForm, HouseFilterForm
 from django.contrib.auth.decorators import login_required
 # :TODO read
 from django.contrib import messages
@@ -14,7 +20,18 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.db.models import Exists, OuterRef, Value, BooleanField, Q
 from django.core.cache  import cache
 from django.views.decorators.http import require_POST
-from .mixins import WelcomeMessageMixins
+from .mixins import WelcomeMessageMixins, ConditionalGetMixin, make_etag
+from .pagination import WindowCountPaginator, KeysetPaginationMixin, KeysetPaginator
+from .search import search_houses, match_houses
+from .filters import filter_houses, sort_houses, house_facets
+from .favorites import favorite_house_ids, mark_favorites
+from .clusters import map_clusters_for_viewport
+from .counters import record_view, last_flushed_generation
+from .analytics import total_views_since
+from .querycache import table_version
+from .fragments import render_cards
+from . import warmup, uploads
+from django.utils.functional import SimpleLazyObject
 from django.views.generic import UpdateView
 
 
@@ -58,12 +75,19 @@ class LandlordRequiredMixin(UserPassesTestMixin):
 
 
 class ViewCountMixin:
+    """
+    Counts a view each time get_object runs. Must come before DetailView in the bases.
+    The view is buffered in the cache and written to view_count by a batched flush (see housing.counters).
+    """
     def get_object(self, queryset=None):
         obj = super().get_object(queryset)
-        model = obj.__class__
-        model.objects.filter(pk=obj.pk).update(view_count=F("view_count") + 1)
+        self.count_view(obj.pk)
         return obj
 
+    def count_view(self, pk):
+        user = self.request.user
+        record_view(pk, user.pk if user.is_authenticated else None, self.request.META.get("REMOTE_ADDR"))
+
 
 from django.db.models import F
 from django.utils.timezone import now
@@ -109,18 +133,38 @@ class ReviewCreateReview(LoginRequiredMixin, CreateView):
         house = get_object_or_404(House, pk=self.kwargs["pk"])
         form.instance.house = house
         form.instance.author = self.request.user
+        # The review and its house's rating aggregates (housing.ratings, via signals) commit together.
+        with transaction.atomic():
+            response = super().form_valid(form)
         messages.success(self.request, "Your review has been submitted successfully!")
-        return super().form_valid(form)
+        return response
     
     def get_success_url(self):
         return reverse_lazy("housing:house-detail", kwargs={"pk": self.kwargs["pk"]})
 
 
-class HouseListView(WelcomeMessageMixins, ListView):
+class HouseListView(ConditionalGetMixin, WelcomeMessageMixins, KeysetPaginationMixin, ListView):
     model = House
     paginate_by = 6
     template_name = "housing/house_list.html"
     context_object_name = "houses"  # The variable name used in the template to loop through house
+    # Sorts on counters that change without any save (housing.counters), so without a table version bump.
+    COUNTER_SORTS = {"most_viewed", "trending"}
+
+    def get_etag(self):
+        """
+        Everything the page is built from, read from the cache without a query: the query string,
+        the viewer and their favorites, and the versions of the tables behind the cards and facets
+        (housing.querycache). Counter sorts also change with every batched view flush.
+        """
+        user = self.request.user
+        parts = [
+            "houses", self.request.GET.urlencode(), user.pk, sorted(favorite_house_ids(user)),
+            *(table_version(model) for model in (House, HouseImage, HouseReview)),
+        ]
+        if self.request.GET.get("sort") in self.COUNTER_SORTS:
+            parts.append(last_flushed_generation())
+        return make_etag(*parts)
     def price_to_int(self):
         """
         A helper function to confirm if a type digit was submited as query parameter
@@ -133,24 +177,68 @@ class HouseListView(WelcomeMessageMixins, ListView):
             return None
         
 
+    def get_search_query(self):
+        """The free text typed in the search box, stripped. Empty string if none."""
+        return (self.request.GET.get("q") or "").strip()
+
+    def get_filter_form(self):
+        """The bound filter/sort form (price, bedrooms, amenities, distance, sort). Built once per request."""
+        if not hasattr(self, "filter_form"):
+            self.filter_form = HouseFilterForm(self.request.GET)
+        return self.filter_form
+
+    def get_filter_data(self):
+        """Cleaned filter values, or an empty dict if the query string did not validate."""
+        form = self.get_filter_form()
+        return form.cleaned_data if form.is_valid() else {}
+
+    def get_base_queryset(self):
+        """
+        Houses narrowed down by the filter form, in the requested (or default) order.
+        Used when there is no search, and as the fallback when a search has no hits.
+        """
+        data = self.get_filter_data()
+        queryset = filter_houses(super().get_queryset(), data).order_by("created_at", "pk")
+        return sort_houses(queryset, data.get("sort"))
+
     def get_queryset(self):
-        queryset = super().get_queryset().order_by("created_at")
-        q = self.request.GET.get("q") if  self.request.GET.get("q") else ""
-        price = self.price_to_int()
+        """
+        Without ?q= this is the filtered listing. With ?q= the houses are matched against the
+        full-text index and ranked by relevance (see housing.search.search_houses), unless the
+        user picked another sort.
+        The "no results" fallback is handled in paginate_queryset, where the hit count is
+        already known, so the search is not run twice.
+        """
+        queryset = self.get_base_queryset()
+        q = self.get_search_query()
         if q:
-            result = queryset.filter(
-                Q(title__icontains=q) |
-                Q(location__icontains=q) |
-                Q(house_desc__icontains=q) 
-            ).order_by("-created_at")
-        
-            if not result.exists():
-                messages.warning(self.request, f"No houses matched '{q}'. showing all houses instead")
-                return queryset  # fallback to default
-
-            return result  # result 
-       
-        return queryset
+            self.facet_queryset = match_houses(queryset, q)
+            ranked = sort_houses(search_houses(queryset, q), self.get_filter_data().get("sort"))
+            return ranked.for_cards(prefetch_images=False)
+        self.facet_queryset = queryset
+        return queryset.for_cards(prefetch_images=False)  # Images are loaded for uncached cards only.
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        """Search results carry their own hit count (search_total), so use the paginator that reads it."""
+        if "search_total" in queryset.query.annotations:
+            return WindowCountPaginator(queryset, per_page, orphans=orphans,
+                                        allow_empty_first_page=allow_empty_first_page, **kwargs)
+        return super().get_paginator(queryset, per_page, orphans, allow_empty_first_page, **kwargs)
+
+    def use_keyset_pagination(self, queryset):
+        """Browsing pages by cursor. Search results keep numbered pages because their hit count is free."""
+        return not self.get_search_query() and super().use_keyset_pagination(queryset)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, object_list, is_paginated = super().paginate_queryset(queryset, page_size)
+        q = self.get_search_query()
+        self.search_fell_back = False
+        if q and paginator.count == 0:
+            messages.warning(self.request, f"No houses matched '{q}'. showing all houses instead")
+            self.search_fell_back = True
+            self.facet_queryset = self.get_base_queryset()
+            return super().paginate_queryset(self.facet_queryset.for_cards(prefetch_images=False), page_size)  # fallback to default
+        return paginator, page, object_list, is_paginated
 
    
     # def get_queryset(self):
@@ -208,27 +296,34 @@ class HouseListView(WelcomeMessageMixins, ListView):
         # Add a list of 3 featured houses to the context.
         # These are used on the house list page.
 
-        # Fetch cache hero homes.
-        popular_houses = cache.get("popular_houses")
-        if not popular_houses:
-            popular_houses = list(House.objects.order_by("-view_count")[:2])
-            cache.set("popular_houses", popular_houses, 900)  # Cache for 24 hours
-        context["popular_houses"] = popular_houses
-        hero_homes = cache.get("hero_home_list")
-        if not hero_homes:
-            hero_homes = list(House.objects.all()[:3])
-
-            # Caching time
-            cache.set("hero_home_list", hero_homes, 900)  # Cache for 24 hours
-        context["hero_homes"] = hero_homes
+        # Hero and popular houses go through the ID-list cache (housing.querycache), invalidated when
+        # a house or image is written and kept warm by housing.warmup. Lazy, so pages that never
+        # show them cost no query at all.
+        context["popular_houses"] = SimpleLazyObject(warmup.popular_houses)
+        context["hero_homes"] = SimpleLazyObject(warmup.hero_homes)
 
         # If the user has navigated to the house list page from the home page, set
         # a flag in the context so that the template can show the hero section welcoming
         # them to the house list page.
-        context["hero_homes"] = House.objects.all()[:3]  # Additional data
         from_home = self.request.GET.get("focus") == "yes"
         context["focused"] = from_home
 
+        # Heart state for every card of the page from the cached favorite-ID set, no query per card.
+        mark_favorites(context["houses"], self.request.user)
+        # Card HTML from the per-listing fragment cache, only cards that changed are rendered.
+        render_cards(context["houses"], "housing/_house_card.html", "house", prefetch=[House.objects.card_images()])
+
+        # Filter sidebar: the form and the facet counts of the whole result set (one aggregate query).
+        context["filter_form"] = self.get_filter_form()
+        context["facets"] = house_facets(self.facet_queryset)
+        # Query string without the page number, so pagination links keep the search and filters.
+        query = self.request.GET.copy()
+        query.pop(self.page_kwarg, None)
+        query.pop(self.cursor_kwarg, None)
+        if self.search_fell_back:
+            query.pop("q", None)  # The next pages belong to the fallback listing, not the failed search.
+        context["query_string"] = query.urlencode()
+
         return context
 
 
@@ -287,7 +382,7 @@ class HouseCreateView(LoginRequiredMixin, View):
                     house = house_form.save(commit=False)
                     # Attach owner/land-lord (make sure House model has an 'owner' or land-lord
                     house.owner = request.user
-                    house.save()
+                    house.save(force_insert=True)  # A new row, never an UPDATE over counters.
                     # save formset images
                     if formset.total_form_count() < 8:
                         for img in formset.cleaned_data:
@@ -315,11 +410,45 @@ class HouseCreateView(LoginRequiredMixin, View):
         })
 
 
-class HouseDetailView(DetailView, ViewCountMixin):
+class HouseDetailView(ConditionalGetMixin, ViewCountMixin, DetailView):
     model = House
     template_name = "housing/house_detail.html"
     context_object_name = "house_detail"
 
+    def get_queryset(self):
+        return House.objects.for_detail()
+
+    def get_change_info(self):
+        """(updated_at, owner_id) of the house from one primary key lookup, None if there is no such house."""
+        if not hasattr(self, "_change_info"):
+            self._change_info = (
+                House.objects.filter(pk=self.kwargs["pk"]).values_list("updated_at", "owner_id").first()
+            )
+        return self._change_info
+
+    def get_etag(self):
+        info = self.get_change_info()
+        if info is None:
+            return None  # get() raises the 404.
+        updated_at, owner_id = info
+        user_id = self.request.user.pk
+        # The owner also sees the views of the last week, which move without touching updated_at.
+        hour = now().strftime("%Y%m%d%H") if user_id == owner_id else ""
+        return make_etag("house", self.kwargs["pk"], updated_at.isoformat(), user_id, hour)
+
+    def get_last_modified(self):
+        """Anonymous pages only, a date alone cannot tell which user the cached copy was rendered for."""
+        info = self.get_change_info()
+        if info is None or self.request.user.is_authenticated:
+            return None
+        return info[0]
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 304:
+            self.count_view(self.kwargs["pk"])  # Still a view, get_object did not run.
+        return response
+
     # def get_object(self, queryset=None):
     #     """
     #     In Django’s class-based views (like DetailView), get_object() is responsible for retrieving the object that the view will display.
@@ -335,9 +464,14 @@ class HouseDetailView(DetailView, ViewCountMixin):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        house = self.get_object()
-        context["reviews"] = house.reviews.all().order_by('-reviewed_on')
+        house = self.object  # Already fetched by get(), calling get_object again would count the view twice.
+        # First page of reviews only, the rest is fetched by "More reviews" (house_reviews).
+        context["reviews"] = review_page(house.pk)
         context["review_form"] = HouseReviewForm()
+        if self.request.user.pk == house.owner_id:
+            # Owners see recent interest, read from the daily rollups (never the raw ViewLog).
+            since = now() - datetime.timedelta(days=7)
+            context["views_last_week"] = total_views_since([house.pk], since).get(house.pk, 0)
         return context
 
 
@@ -408,23 +542,140 @@ class FavouriteListView(LoginRequiredMixin, ListView):
 
         :return: A QuerySet of House objects that are favorited by the user.
         """
-        # Get only houses favorited by user
-        qs = House.objects.filter(
-            favorites__user=self.request.user
-        ).distinct()
-
-        # Annotate is_favorited for template logic (always true)
-        qs = House.objects.filter(favorites__user=self.request.user).distinct()  # distinct avoid duplicates.
+        # Get only houses favorited by user, straight from the cached favorite-ID set (no join, no distinct).
+        qs = House.objects.filter(pk__in=favorite_house_ids(self.request.user))
 
         # Annotate is_favorited for template logic (always true)
         qs = qs.annotate(
             is_favorited=Value(True, output_field=BooleanField())
-        ).prefetch_related("favorites")  # prefetch_related is used to avoid a database query for each favorite to get the house
+        ).for_cards()  # Images prefetched, image_count annotated: no per-card queries
 
         # Return the QuerySet
         return qs
 
 
+REVIEWS_PER_PAGE = 6
+
+
+def review_page(house_id, cursor=None):
+    """
+    One keyset page of a house's reviews, newest first, authors included (one query).
+    It seeks on (reviewed_on, id) with the (house, reviewed_on) index, so it costs the same
+    however many reviews the house has.
+    :raises InvalidPage: For a bad cursor.
+    """
+    reviews = HouseReview.objects.filter(house_id=house_id).select_related("author")
+    paginator = KeysetPaginator(reviews, REVIEWS_PER_PAGE, ordering=("-reviewed_on", "-pk"))
+    return paginator.page(cursor)
+
+
+def house_reviews(request, pk):
+    """
+    "More reviews" endpoint of the detail page.
+
+    Query parameters:
+    - cursor: next_cursor of the previous page.
+    :return: {"html": <rendered review cards>, "next_cursor": <cursor or null>}
+    """
+    try:
+        page = review_page(pk, request.GET.get("cursor"))
+    except InvalidPage:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    html = render_to_string("housing/_review_list.html", {"reviews": page}, request=request)
+    return JsonResponse({"html": html, "next_cursor": page.next_cursor})
+
+
+def map_clusters(request):
+    """
+    JSON markers for the house map.
+
+    Query parameters:
+    - zoom: Map zoom level (0-22).
+    - bbox: Viewport as "west,south,east,north" in degrees.
+
+    Markers are precomputed clusters (see housing.clusters), so the payload never exceeds
+    a few hundred entries no matter how many houses are listed.
+    :return: {"zoom": <zoom used>, "clusters": [{"lat", "lng", "count", "min_price", "max_price", "house_id"}]}
+    """
+    try:
+        zoom = int(request.GET.get("zoom", 12))
+        west, south, east, north = (float(value) for value in request.GET["bbox"].split(","))
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "zoom and bbox=west,south,east,north are required"}, status=400)
+    if not all(math.isfinite(value) for value in (west, south, east, north)):
+        return JsonResponse({"error": "Invalid zoom or bbox"}, status=400)
+    if not 0 <= zoom <= 22 or south > north or west > east:
+        return JsonResponse({"error": "Invalid zoom or bbox"}, status=400)
+
+    zoom, markers = map_clusters_for_viewport(zoom, south, west, north, east)
+    return JsonResponse({"zoom": zoom, "clusters": markers})
+
+
+
+class HouseUploadStartView(LoginRequiredMixin, View):
+    """
+    Start a chunked upload of a video or image for one of the user's houses (see housing.uploads).
+    Body: JSON {"kind": "video"|"image", "filename", "size", "sha256"}.
+    :return: 201 with {"id", "offset", "size", "chunk_size", "url"}, the URL chunks are PUT to.
+    """
+
+    def post(self, request, pk):
+        house = get_object_or_404(House, pk=pk, owner=request.user)
+        try:
+            data = json.loads(request.body)
+            upload = uploads.start_upload(house, request.user, data.get("kind"), data.get("filename"),
+                                          data.get("size"), data.get("sha256"))
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Expected a JSON object"}, status=400)
+        except uploads.UploadError as exc:
+            return JsonResponse({"error": str(exc)}, status=exc.status)
+        return JsonResponse(self.state(upload), status=201)
+
+    @staticmethod
+    def state(upload):
+        return {**uploads.upload_state(upload), "url": reverse("housing:house-upload", args=[upload.pk])}
+
+
+class HouseUploadView(LoginRequiredMixin, View):
+    """
+    One chunked upload (see housing.uploads).
+    - GET: the acknowledged offset, where to resume.
+    - PUT: one chunk as raw body, at the offset given by the Upload-Offset header, with an optional
+      Upload-Checksum (hex SHA-256 of the chunk). The body is streamed to disk, never read whole.
+    - DELETE: abandon the upload.
+    Errors answer {"error", "offset"} so that the client can always pick up from the right place.
+    """
+
+    def get_upload(self):
+        return get_object_or_404(HouseUpload, pk=self.kwargs["upload_id"], owner=self.request.user)
+
+    def get(self, request, upload_id):
+        return JsonResponse(HouseUploadStartView.state(self.get_upload()))
+
+    def put(self, request, upload_id):
+        upload = self.get_upload()
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return JsonResponse({"error": "Upload-Offset and Content-Length are required",
+                                 "offset": upload.offset}, status=400)
+        try:
+            attached = uploads.receive_chunk(upload, offset, request, length, request.headers.get("Upload-Checksum"))
+        except uploads.UploadError as exc:
+            if exc.status == 409:
+                upload.refresh_from_db(fields=["offset"])
+            return JsonResponse({"error": str(exc), "offset": upload.offset}, status=exc.status)
+        if attached is None:
+            return JsonResponse(HouseUploadStartView.state(upload))
+        return JsonResponse({"complete": True, "offset": upload.size,
+                             "url": attached.video.url if upload.kind == HouseUpload.VIDEO else attached.image.url},
+                            status=201)
+
+    def delete(self, request, upload_id):
+        uploads.abort_upload(self.get_upload())
+        return HttpResponse(status=204)
+
 @require_POST
 @login_required
 def toggle_favorite(request):
@@ -515,8 +766,16 @@ class HouseDetailEditView(UpdateView):
     pk_url_kwarg = "pk"
 
     def form_valid(self, form):
+        """
+        Save only the fields the form changed. A full save would write back the review_count,
+        rating_*, view_count and trending_score loaded with the form, losing any counter update
+        made meanwhile (housing.counters, housing.ratings, housing.trending).
+        """
+        self.object = form.save(commit=False)
+        if form.changed_data:
+            self.object.save(update_fields=[*form.changed_data, "updated_at"])
         messages.success(self.request, "House details updated successfully.")
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
     def form_invalid(self, form):
         messages.error(self.request, "Please correct the errors below.")
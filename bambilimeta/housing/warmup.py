@@ -0,0 +1,87 @@
+"""
+Cache warming for the list pages (HouseListView, ProductListView).
+
+A worker that just started, or a cache that was just emptied, made the first visitors pay for
+everything at once: the hero homes, the popular houses and the hero product queries, the URL
+resolvers, the template compilation. Here those are filled before anybody asks:
+
+- per process (warm_process): URL resolvers and compiled templates, from bambilimeta.wsgi when a
+  web worker boots;
+- shared (warm_shared): the ID-list cache entries of housing.querycache, at boot too, then by the
+  periodic task housing.tasks.refresh_list_caches every REFRESH_INTERVAL, i.e. CACHE_WARM_MARGIN
+  seconds before they expire, and by housing.tasks.warm_list_caches right after a write moved
+  their table versions (housing.signals, marketplace.signals).
+
+``manage.py warm_caches`` runs both, e.g. as the last step of a deploy.
+"""
+import logging
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.template.loader import get_template
+from django.urls import resolve, reverse
+
+from .models import House, HouseImage
+from .querycache import QUERY_CACHE_TIMEOUT, cached_queryset
+from .trending import trending_houses
+
+logger = logging.getLogger(__name__)
+
+WARM_MARGIN = getattr(settings, "CACHE_WARM_MARGIN", 60 * 3)
+REFRESH_INTERVAL = QUERY_CACHE_TIMEOUT - WARM_MARGIN
+WARM_URLS = ("housing:home", "market:home")
+WARM_TEMPLATES = (
+    "housing/house_list.html", "housing/_house_card.html", "housing/_picture.html",
+    "marketplace/product_list.html", "marketplace/_product_card.html",
+)
+
+
+def hero_homes(refresh=False):
+    """The three houses of the list page's hero section."""
+    return cached_queryset(House.objects.for_cards().order_by("pk")[:3], depends_on=[HouseImage], refresh=refresh)
+
+
+def popular_houses(refresh=False):
+    """The two trending houses of the list page's sidebar."""
+    return cached_queryset(
+        trending_houses(House.objects.for_cards(), limit=2), depends_on=[HouseImage], refresh=refresh
+    )
+
+
+def hero_product(refresh=False):
+    """The newest product, with its images, for the product list's hero section. None without products."""
+    from marketplace.models import Product, ProductImage
+    products = cached_queryset(
+        Product.objects.prefetch_related("images").order_by("-created_at", "-pk")[:1],
+        depends_on=[ProductImage], refresh=refresh,
+    )
+    return products[0] if products else None
+
+
+SHARED_ENTRIES = (hero_homes, popular_houses, hero_product)
+
+
+def warm_shared(refresh=False):
+    """
+    Fill the shared cache entries of the list pages.
+    :param refresh: Recompute the ones that are still fresh too, pushing their expiry back.
+    """
+    for entry in SHARED_ENTRIES:
+        entry(refresh=refresh)
+
+
+def warm_process():
+    """Fill this process's own caches: URL resolvers and the cached template loader."""
+    for name in WARM_URLS:
+        resolve(reverse(name))  # Populates the root resolver and the namespace's, both ways.
+    for name in WARM_TEMPLATES:
+        get_template(name)
+
+
+def warm_up():
+    """Everything, in this process and in the shared cache. Never fails the caller: a cold cache still works."""
+    try:
+        warm_process()
+        warm_shared()
+    except DatabaseError:  # E.g. a worker booting before its migrations ran.
+        logger.exception("Could not warm the list page caches")
@@ -1,11 +1,40 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Substr
 
 from django.utils import timezone
 from datetime import timedelta
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
-
+from housing.images import ImageVariantsMixin
+
+
+
+class ProductQuerySet(models.QuerySet):
+    def for_cards(self, prefetch_images=True):
+        """
+        Everything a product card needs, in a fixed number of queries no matter how many cards:
+        - the seller joined in (select_related),
+        - description deferred, with a short ``summary`` prefix selected instead,
+        - image_count as a correlated COUNT subquery,
+        - all images of the page in one prefetch query.
+        Templates should use product.summary, product.image_count and product.images.all.
+        :param prefetch_images: False when cards come from housing.fragments, which prefetches
+            card_images() for the cards it has to render only.
+        """
+        image_count = (
+            ProductImage.objects.filter(product=models.OuterRef("pk"))
+            .order_by().values("product").annotate(total=models.Count("pk")).values("total")
+        )
+        queryset = self.select_related("seller").defer("description").annotate(
+            summary=Substr("description", 1, 120),
+            image_count=Coalesce(models.Subquery(image_count), 0),
+        )
+        return queryset.prefetch_related(self.card_images()) if prefetch_images else queryset
+
+    @staticmethod
+    def card_images():
+        return models.Prefetch("images", queryset=ProductImage.objects.order_by("pk"))
 
 
 class Product(models.Model):
@@ -43,6 +72,8 @@ class Product(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} by {self.seller.username}"
 
@@ -93,16 +124,18 @@ class Product(models.Model):
         return self.name.upper()
 
 
-class ProductImage(models.Model):
+class ProductImage(ImageVariantsMixin, models.Model):
     """
     Image associated with a product.
 
     Fields:
     - product: The product the image belongs to.
-    - image: Actual image file.
+    - image: Actual image file, as uploaded.
+    - variants: Resized WebP/JPEG copies with their sizes, written by housing.images.
     """
     product = models.ForeignKey(Product, related_name="images", on_delete=models.CASCADE)
     image = models.ImageField(upload_to="product_images", blank=True, null=True)
+    variants = models.JSONField(default=list, blank=True, editable=False)
 
 
 
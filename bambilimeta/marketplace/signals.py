@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from housing import querycache, fragments, images
+from housing.tasks import queue_list_cache_warming
+from .models import Product, ProductImage
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductImage)
+def bump_query_cache_version(sender, **kwargs):
+    """Invalidate every cached query over the written table (see housing.querycache)."""
+    querycache.bump_table_version(sender)
+    queue_list_cache_warming()  # The hero product (housing.warmup) depends on these tables.
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductImage)
+def bump_product_card_version(sender, instance, **kwargs):
+    """The product or one of its images changed, so its cached list card (housing.fragments) is stale."""
+    fragments.bump_card_version(Product, instance.pk if sender is Product else instance.product_id)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def touch_product(sender, instance, raw=False, **kwargs):
+    """Changing an image moves Product.updated_at, the ETag / Last-Modified of the product page."""
+    if raw:
+        return
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ProductImage)
+def queue_image_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    """A photo was uploaded or replaced: resize it in the background once committed (housing.images)."""
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    if instance.image and not instance.variants_ready:
+        images.queue_image(instance)
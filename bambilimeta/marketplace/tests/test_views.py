@@ -120,6 +120,18 @@ class ProductListViewTest(TestCase):
         self.assertTrue('products' in response.context)
         self.assertEqual(len(response.context['products']), 10)
 
+    def test_cursor_links_keep_the_other_query_parameters(self):
+        seller = User.objects.get(username='testuser')
+        for i in range(3):  # One page and a bit.
+            Product.objects.create(name=f'Extra {i}', price=1, stock=1, description='Extra', seller=seller)
+        response = self.client.get(reverse('market:home'), {'from': 'home'})
+        next_cursor = response.context['page_obj'].next_cursor
+        self.assertContains(response, f'href="?from=home&cursor={next_cursor}"')
+
+        response = self.client.get(reverse('market:home'), {'from': 'home', 'cursor': next_cursor})
+        self.assertTrue(response.context['show_hero'])
+        self.assertContains(response, f'href="?from=home&cursor={response.context["page_obj"].previous_cursor}"')
+
 
 class ProductDetailViewTest(TestCase):
     def setUp(self):
@@ -151,6 +163,16 @@ class ProductDetailViewTest(TestCase):
         self.assertContains(response, self.product.description)
         self.assertContains(response, self.product.price)
 
+    def test_not_modified_until_the_product_or_its_images_change(self):
+        url = reverse('market:product-detail', kwargs={'pk': self.product.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        ProductImage.objects.create(product=self.product, image='product_images/a.jpg')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
 
 class ToggleFavoriteViewTest(TestCase):
     def setUp(self):
@@ -9,6 +9,12 @@ from django.http import JsonResponse
 from .models import Product, Favorite
 
 from django.shortcuts import get_object_or_404, redirect
+from housing.pagination import KeysetPaginationMixin
+from housing.fragments import render_cards
+from housing.mixins import ConditionalGetMixin, make_etag
+from housing.querycache import table_version
+from housing import warmup
+from django.utils.functional import SimpleLazyObject
 
 # class ImageFormsetMixin(BaseFormView):
 #     """
@@ -237,13 +243,25 @@ class ProductCreateView(CreateView):
             return self.form_invalid(form)
 
 
-class ProductListView(ListView):
+class ProductListView(ConditionalGetMixin, KeysetPaginationMixin, ListView):
     """
     A view to list all products.
+    Pages are served by cursor (?cursor=...), newest first, see housing.pagination.KeysetPaginationMixin.
     """
     model = Product
     template_name = "marketplace/product_list.html"
     context_object_name = "products"
+    paginate_by = 12
+    ordering = ("-created_at", "-pk")
+
+    def get_etag(self):
+        """Query string, viewer and table versions (housing.querycache), all from the cache."""
+        return make_etag("products", self.request.GET.urlencode(), self.request.user.pk,
+                         table_version(Product), table_version(ProductImage))
+
+    def get_queryset(self):
+        """Card projection: seller joined, image_count annotated, description deferred. Images are loaded by render_cards."""
+        return super().get_queryset().for_cards(prefetch_images=False)
     # Good practice to add a success url
 
     def get_context_data(self, *, object_list=None, **kwargs):
@@ -255,19 +273,43 @@ class ProductListView(ListView):
         :return: The context for the home page
         """
         context = super().get_context_data(**kwargs)
+        # Card HTML from the per-listing fragment cache, only cards that changed are rendered.
+        render_cards(context["products"], "marketplace/_product_card.html", "product",
+                     prefetch=[Product.objects.card_images()])
         # If the request was made from the home page, show the hero section
         from_home = self.request.GET.get("from") == "home"
         context["show_hero"] = from_home
-        # Get the first product as the hero product
-        context["hero_product"] = Product.objects.first()
+        # The newest product as the hero product, from the ID-list cache kept warm by housing.warmup.
+        context["hero_product"] = SimpleLazyObject(warmup.hero_product)
+        # Query string without the page or cursor, so pagination links keep the rest (e.g. from=home).
+        query = self.request.GET.copy()
+        query.pop(self.page_kwarg, None)
+        query.pop(self.cursor_kwarg, None)
+        context["query_string"] = query.urlencode()
         return context
 
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalGetMixin, DetailView):
     model = Product
     context_object_name = "product"
     template_name = "marketplace/product_detail.html"
 
+    def get_updated_at(self):
+        """Product.updated_at from one primary key lookup (images touch it too), None if there is no such product."""
+        if not hasattr(self, "_updated_at"):
+            self._updated_at = Product.objects.filter(pk=self.kwargs["pk"]).values_list("updated_at", flat=True).first()
+        return self._updated_at
+
+    def get_etag(self):
+        updated_at = self.get_updated_at()
+        if updated_at is None:
+            return None  # get() raises the 404.
+        return make_etag("product", self.kwargs["pk"], updated_at.isoformat(), self.request.user.pk)
+
+    def get_last_modified(self):
+        """Anonymous pages only, a date alone cannot tell which user the cached copy was rendered for."""
+        return None if self.request.user.is_authenticated else self.get_updated_at()
+
 
 def toggle_favorite(request, pk):
 
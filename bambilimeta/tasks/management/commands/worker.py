@@ -0,0 +1,25 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.queue import work
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (image variants, view count flushes...). Run one or more, e.g. under systemd."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--burst", action="store_true", help="Exit once no task is due (cron, deploys, CI).")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when no task is due.")
+
+    def handle(self, *args, **options):
+        stopping = []
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the current task...")
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        ran = work(burst=options["burst"], sleep=options["sleep"], should_stop=lambda: bool(stopping))
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} tasks."))
@@ -0,0 +1,49 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    One unit of deferred work, run by ``manage.py worker`` (see tasks.queue).
+
+    Fields:
+    - name: Dotted path of the @task function.
+    - args / kwargs: JSON arguments it is called with.
+    - priority: Higher runs first among the tasks that are due.
+    - status: pending -> running -> done, or back to pending for a retry, or failed for good.
+    - run_at: Not run before this time (retries back off, periodic tasks wait for their slot).
+    - attempts / max_attempts: Runs so far, and how many are allowed before giving up.
+    - unique_key: Set while pending/running to keep a single instance (periodic tasks), then cleared.
+    - locked_by / locked_at: Worker that claimed it and when, to recover tasks of a dead worker.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(PENDING, "Pending"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    unique_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    locked_by = models.CharField(max_length=128, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The claim query: due pending tasks, best priority first.
+            models.Index(fields=["status", "priority", "run_at"]),
+            models.Index(fields=["status", "finished_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
@@ -0,0 +1,213 @@
+"""
+Background task queue kept in the database, no broker to run: a Task row per job, ``manage.py worker`` to run them.
+
+Declare a task with the decorator, in an app's ``tasks.py`` (found by TasksConfig.ready)::
+
+    @task(priority=5, max_attempts=3)
+    def send_welcome_mail(user_id):
+        ...
+
+    send_welcome_mail.delay(user.pk)             # From a view or a signal handler, returns right away.
+    send_welcome_mail.apply_async((user.pk,), countdown=60, unique_key=f"welcome:{user.pk}")
+
+``delay`` inserts the row in the caller's transaction: a rolled back request enqueues nothing and a
+worker never sees the job before the data it refers to is committed. Arguments go through JSON, so
+pass primary keys, not model instances. Calling the function directly still runs it inline.
+
+Workers claim the due task of highest priority with a single UPDATE (SQLite serializes writers, so
+two workers never get the same row). A task that raises is retried after an exponential backoff
+with jitter (TASKS_RETRY_BASE seconds, doubled per attempt, capped at TASKS_RETRY_MAX) until it has
+run max_attempts times, then left as failed with its traceback in last_error. A task whose worker
+died is handed out again once it has been running for TASKS_LOCK_TIMEOUT seconds.
+
+``@task(every=...)`` declares a periodic job: the worker schedules it when it starts, and every run
+schedules the next one, ``every`` seconds after the previous was due. Its unique_key keeps a single
+instance queued however many workers run.
+"""
+import logging
+import os
+import random
+import socket
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE = getattr(settings, "TASKS_RETRY_BASE", 10)
+RETRY_MAX = getattr(settings, "TASKS_RETRY_MAX", 60 * 60)
+LOCK_TIMEOUT = getattr(settings, "TASKS_LOCK_TIMEOUT", 60 * 10)
+RESULT_RETENTION = getattr(settings, "TASKS_RESULT_RETENTION", 60 * 60 * 24 * 7)  # Finished rows, in seconds.
+
+registry = {}  # Task name -> function.
+periodic = {}  # Task name -> interval in seconds.
+
+
+def task(func=None, *, priority=0, max_attempts=5, every=None):
+    """
+    Register func as a task and give it ``delay`` / ``apply_async``. Usable bare or with options.
+    :param priority: Higher runs first among the due tasks.
+    :param max_attempts: Runs before giving up, retries included.
+    :param every: Seconds (or a timedelta) between the runs of a periodic task, which then takes no arguments.
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        registry[name] = func
+        if every is not None:
+            periodic[name] = every.total_seconds() if isinstance(every, timedelta) else every
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+
+        def apply_async(args=(), kwargs=None, countdown=0, priority=priority, unique_key=None):
+            return enqueue(name, args, kwargs, priority=priority, max_attempts=max_attempts,
+                           countdown=countdown, unique_key=unique_key)
+
+        wrapper.task_name = name
+        wrapper.apply_async = apply_async
+        wrapper.delay = lambda *args, **kwargs: apply_async(args, kwargs)
+        return wrapper
+
+    return decorator(func) if func is not None else decorator
+
+
+def enqueue(name, args=(), kwargs=None, priority=0, max_attempts=5, countdown=0, unique_key=None):
+    """
+    Queue a run of the task called name, in the current transaction.
+    :param countdown: Seconds to wait before running it.
+    :param unique_key: Skip if a task with this key is already pending or running.
+    :return: The new Task, or None when unique_key was taken.
+    """
+    job = Task(
+        name=name, args=list(args), kwargs=kwargs or {}, priority=priority, max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=countdown), unique_key=unique_key,
+    )
+    if unique_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():  # A savepoint: a taken key must not break the caller's transaction.
+            job.save()
+    except IntegrityError:  # Already pending or running, whoever inserted it first.
+        return None
+    return job
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a task that failed its attempts-th run: doubling, capped, with jitter."""
+    delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def schedule_periodic():
+    """Queue every periodic task that is not queued yet (first start, or after its row was deleted)."""
+    for name in periodic:
+        enqueue(name, unique_key=f"periodic:{name}")
+
+
+def schedule_next_run(name, run_at):
+    """Queue the next run of the periodic task name, whose last run was due at run_at."""
+    # From when this run was due, not from now, so a slow run does not make the schedule drift.
+    countdown = (run_at + timedelta(seconds=periodic[name]) - timezone.now()).total_seconds()
+    enqueue(name, countdown=max(countdown, 0), unique_key=f"periodic:{name}")
+
+
+def requeue_stale():
+    """
+    Hand out again the tasks of workers that died mid-run. Their attempt counts as a failed one.
+    A periodic task given up on this way gets its next run queued, as when it fails in execute.
+    """
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=LOCK_TIMEOUT))
+    given_up = stale.filter(attempts__gte=F("max_attempts"))
+    with transaction.atomic():
+        given_up_periodic = list(given_up.filter(name__in=list(periodic)).values_list("name", "run_at"))
+        failed = given_up.update(
+            status=Task.FAILED, finished_at=timezone.now(), unique_key=None, last_error="Worker lost."
+        )
+        for name, run_at in given_up_periodic:
+            schedule_next_run(name, run_at)
+    return failed + stale.update(status=Task.PENDING, locked_by="", last_error="Worker lost.")
+
+
+def claim(worker_id):
+    """Mark the due pending task of highest priority as running for worker_id and return it, None if there is none."""
+    now = timezone.now()
+    lock = f"{worker_id}:{uuid.uuid4().hex}"
+    due = Task.objects.filter(status=Task.PENDING, run_at__lte=now).order_by("-priority", "run_at", "pk")
+    claimed = Task.objects.filter(pk=Subquery(due.values("pk")[:1]), status=Task.PENDING).update(
+        status=Task.RUNNING, locked_by=lock, locked_at=now, attempts=F("attempts") + 1
+    )
+    return Task.objects.get(locked_by=lock) if claimed else None
+
+
+def execute(job):
+    """Run a claimed task and record the outcome: done, retry later, or failed."""
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {job.name}.")
+        func(*job.args, **job.kwargs)
+    except Exception:
+        logger.exception("Task %s #%s failed (attempt %s/%s)", job.name, job.pk, job.attempts, job.max_attempts)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts and func is not None:
+            job.status = Task.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        else:
+            job.status = Task.FAILED
+    else:
+        job.status = Task.DONE
+        job.last_error = ""
+
+    with transaction.atomic():
+        if job.status != Task.PENDING:
+            job.finished_at = timezone.now()
+            job.unique_key = None
+        job.locked_by = ""
+        job.save(update_fields=["status", "run_at", "last_error", "finished_at", "unique_key", "locked_by"])
+        if job.name in periodic and job.status != Task.PENDING:
+            schedule_next_run(job.name, job.run_at)
+
+
+def purge_finished(seconds=RESULT_RETENTION):
+    """Delete done and failed tasks that finished more than seconds ago."""
+    cutoff = timezone.now() - timedelta(seconds=seconds)
+    return Task.objects.filter(status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff).delete()[0]
+
+
+def work(burst=False, sleep=1.0, should_stop=lambda: False):
+    """
+    Worker loop: claim and run tasks one at a time.
+    :param burst: Return once no task is due instead of waiting for more.
+    :param sleep: Seconds to wait when no task is due.
+    :param should_stop: Checked between tasks, the loop returns once it is true (e.g. on SIGTERM).
+    :return: The number of tasks run.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    schedule_periodic()
+    ran = 0
+    next_recovery = 0
+    while not should_stop():
+        close_old_connections()  # As a request would: drop connections that broke or outlived CONN_MAX_AGE.
+        if time.monotonic() >= next_recovery:
+            requeue_stale()
+            next_recovery = time.monotonic() + LOCK_TIMEOUT / 2
+        job = claim(worker_id)
+        if job is None:
+            if burst:
+                break
+            time.sleep(sleep)
+            continue
+        execute(job)
+        ran += 1
+    return ran
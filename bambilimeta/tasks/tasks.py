@@ -0,0 +1,8 @@
+from datetime import timedelta
+
+from .queue import purge_finished, task
+
+
+@task(every=timedelta(days=1), priority=-10)
+def purge_finished_tasks():
+    purge_finished()
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Task
+from ..queue import claim, execute, requeue_stale, task, work
+
+calls = []
+
+
+@task
+def record(value):
+    calls.append(value)
+
+
+@task(priority=5)
+def urgent(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def flaky():
+    raise ValueError("Boom")
+
+
+@task(every=60)
+def heartbeat():
+    calls.append("beat")
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_queues_and_the_worker_runs_it(self):
+        record.delay("a")
+        self.assertEqual(calls, [])
+        work(burst=True)
+        self.assertIn("a", calls)
+        self.assertEqual(Task.objects.get(name=record.task_name).status, Task.DONE)
+
+    def test_calling_the_function_runs_it_inline(self):
+        record("b")
+        self.assertEqual(calls, ["b"])
+        self.assertFalse(Task.objects.filter(name=record.task_name).exists())
+
+    def test_higher_priority_first_then_oldest(self):
+        record.delay(1)
+        record.delay(2)
+        urgent.delay(3)
+        while (job := claim("test")) is not None:
+            execute(job)
+        self.assertEqual([call for call in calls if call != "beat"], [3, 1, 2])
+
+    def test_not_run_before_its_countdown(self):
+        record.apply_async(("later",), countdown=60)
+        self.assertIsNone(claim("test"))
+
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        flaky.delay()
+        execute(claim("test"))
+        job = Task.objects.get(name=flaky.task_name)
+        self.assertEqual((job.status, job.attempts), (Task.PENDING, 1))
+        self.assertIn("ValueError: Boom", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=4))
+
+        Task.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        execute(claim("test"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+
+    def test_unique_key_keeps_one_instance_queued(self):
+        self.assertIsNotNone(record.apply_async(("x",), unique_key="only"))
+        self.assertIsNone(record.apply_async(("y",), unique_key="only"))
+        execute(claim("test"))
+        self.assertIsNotNone(record.apply_async(("z",), unique_key="only"))  # Freed once it ran.
+
+    def test_a_taken_unique_key_leaves_the_callers_transaction_usable(self):
+        from unittest import mock
+        from django.db import transaction
+        record.apply_async(("x",), unique_key="only")
+        with transaction.atomic():
+            # As if another process inserted it between our check and our insert: no check at all.
+            with mock.patch.object(Task.objects, "filter", side_effect=AssertionError("Not checked first")):
+                self.assertIsNone(record.apply_async(("y",), unique_key="only"))
+            record.delay("after")
+        self.assertEqual(Task.objects.filter(name=record.task_name).count(), 2)
+
+    def test_periodic_tasks_reschedule_themselves(self):
+        work(burst=True)
+        self.assertEqual(calls, ["beat"])
+        queued = Task.objects.get(name=heartbeat.task_name, status=Task.PENDING)
+        self.assertAlmostEqual((queued.run_at - timezone.now()).total_seconds(), 60, delta=5)
+        work(burst=True)  # Not due yet, and not queued twice.
+        self.assertEqual(calls, ["beat"])
+        self.assertEqual(Task.objects.filter(name=heartbeat.task_name, status=Task.PENDING).count(), 1)
+
+    def test_tasks_of_a_lost_worker_are_handed_out_again(self):
+        record.delay("lost")
+        job = claim("dead worker")
+        Task.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        execute(claim("test"))
+        self.assertEqual(calls, ["lost"])
+        self.assertEqual(Task.objects.get(pk=job.pk).attempts, 2)
+
+    def test_periodic_task_of_a_lost_worker_is_scheduled_again_once_given_up(self):
+        work(burst=True)  # Runs heartbeat and queues its next run.
+        job = Task.objects.get(name=heartbeat.task_name, status=Task.PENDING)
+        Task.objects.filter(pk=job.pk).update(
+            status=Task.RUNNING, attempts=job.max_attempts, locked_by="dead worker",
+            locked_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Task.objects.get(pk=job.pk).status, Task.FAILED)
+        queued = Task.objects.get(name=heartbeat.task_name, status=Task.PENDING)
+        self.assertEqual(queued.unique_key, f"periodic:{heartbeat.task_name}")
+        self.assertAlmostEqual((queued.run_at - job.run_at).total_seconds(), 60, delta=1)
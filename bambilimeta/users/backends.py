@@ -0,0 +1,84 @@
+"""
+Authentication backend that loads request.user together with its profile.
+
+AuthenticationMiddleware resolves request.user through the backend's get_user on every request.
+ModelBackend loads the bare user, so every ``request.user.profile.role`` afterwards (role-aware
+mixins, LandlordRequiredMixin, navigation templates) cost one more query. Here the user is loaded
+with select_related("profile") and the result, user and profile, is kept in the shared cache, so
+in the steady state request.user and every role check cost no query at all.
+
+users.signals drops the cached entry whenever the user or its profile is saved or deleted (a login
+saves last_login, a password change saves the user), so a changed role, picture or password is
+seen on the very next request.
+
+The cache is a file any process on the machine may read, so the password hash never goes in:
+the entry holds the other field values of the user and profile, plus the session auth hash (an
+HMAC of the password hash, which is what the session check compares). The rebuilt user has its
+password deferred: a save writes the loaded fields only, and reading it costs one query.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import router
+from django.db.models.fields.files import FieldFile
+
+REQUEST_USER_TIMEOUT = 60 * 15  # Invalidation is explicit, the timeout only bounds memory.
+
+
+def request_user_cache_key(user_id):
+    return f"request_user:v2:{user_id}"  # v1 entries held whole pickled users.
+
+
+def invalidate_request_user(user_id):
+    cache.delete(request_user_cache_key(user_id))
+
+
+def _field_values(instance, exclude=()):
+    values = {}
+    for field in instance._meta.concrete_fields:
+        if field.attname not in exclude:
+            value = getattr(instance, field.attname)
+            # A FieldFile pickles its model instance along, the user and password included.
+            values[field.attname] = value.name if isinstance(value, FieldFile) else value
+    return values
+
+
+def _from_values(model, values):
+    return model.from_db(router.db_for_read(model), list(values), list(values.values()))
+
+
+def pack_request_user(user):
+    """What the cache keeps of a user: (user fields but the password, profile fields or None, session auth hash)."""
+    profile = getattr(user, "profile", None)
+    return (
+        _field_values(user, exclude={"password"}),
+        profile and _field_values(profile),
+        user.get_session_auth_hash(),
+    )
+
+
+def unpack_request_user(entry):
+    """Rebuild the user of pack_request_user, profile attached, without a query."""
+    user_values, profile_values, session_auth_hash = entry
+    user = _from_values(get_user_model(), user_values)
+    user.get_session_auth_hash = lambda: session_auth_hash  # The real one would load the password.
+    related = user._meta.get_field("profile")
+    profile = profile_values and _from_values(related.related_model, profile_values)
+    related.set_cached_value(user, profile)
+    if profile is not None:
+        related.field.set_cached_value(profile, user)
+    return user
+
+
+class ProfileModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        key = request_user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = get_user_model()._default_manager.select_related("profile").filter(pk=user_id).first()
+            if user is None:
+                return None
+            cache.set(key, pack_request_user(user), REQUEST_USER_TIMEOUT)
+        else:
+            user = unpack_request_user(entry)
+        return user if self.user_can_authenticate(user) else None
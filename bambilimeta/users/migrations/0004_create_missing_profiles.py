@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:00
+
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_profiles(apps, schema_editor):
+    """Profiles used to be created lazily on every user save, now only at registration."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Profile = apps.get_model("users", "Profile")
+    Profile.objects.bulk_create(
+        Profile(user_id=user_id) for user_id in User.objects.filter(profile__isnull=True).values_list("pk", flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_profile_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
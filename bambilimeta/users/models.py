@@ -1,20 +1,20 @@
 from django.db import models
 from django.contrib.auth.models import User, AbstractUser
-from PIL import Image
 from phonenumber_field.modelfields import PhoneNumberField
 from django.db import models
 from django.contrib.auth.models import User
-from PIL import Image
 from django import forms
 from django.shortcuts import reverse
+from housing.images import ImageVariantsMixin
 
-class Profile(models.Model):
+class Profile(ImageVariantsMixin, models.Model):
     """
     Extension of the built-in User model with visual and professional attributes.
 
     Fields:
     - user: One-to-one link to the User model.
-    - image: Profile picture (auto-resizes on save).
+    - image: Profile picture, kept as uploaded.
+    - variants: Square avatar sizes of the picture, written in the background by housing.images.
     - role: Functional role of the user (landlord, entrepreneur...).
     - phone_number: Optional contact number.
     - bio: Short biography or tagline.
@@ -31,25 +31,17 @@ class Profile(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='regular')
     phone_number = PhoneNumberField(blank=True)
     bio = models.CharField(blank=True, max_length=2000)
+    variants = models.JSONField(default=list, blank=True, editable=False)
 
+    variant_widths = (48, 96, 300)
+    square_variants = True
 
     def __str__(self):
         return self.user.username
 
-    def save(self, *args, **kwargs):
-        """
-        Overrides default save behavior.
-
-        Purpose:
-        Resizes profile image to max 300x300 pixels
-        for consistent display and bandwidth savings.
-        """
-        super().save(*args, **kwargs)
-        img = Image.open(self.image.path)
-        if img.height > 300 or img.width > 300:
-            output_size = (300, 300)
-            img.thumbnail(output_size)
-            img.save(self.image.path)
+    @property
+    def has_default_image(self):
+        return self.image.name == self._meta.get_field("image").default
 
     def get_absolute_url(self):
         """
@@ -1,38 +1,59 @@
 # profiles/signals.py
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from housing import images
+from .backends import invalidate_request_user
 from .models import Profile
 
 User = get_user_model()
 
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, raw=False, using=None, update_fields=None, **kwargs):
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
     """
-    Ensure every User has a Profile and keep it saved in sync.
+    Give every new User its Profile, once, at registration.
 
-    - On creation: create a related Profile.
-    - On update: guarantee the Profile exists, then save it.
+    Later saves of the user never touch the profile: a login saves the user with
+    update_fields=["last_login"], and neither that nor any other user update costs a profile
+    query or any image I/O. Users created before this existed got their profile from
+    migration users.0004_create_missing_profiles.
 
     Parameters:
     - sender: The model class sending the signal (User).
     - instance: The User instance just saved.
     - created (bool): True if this was a new User, else False.
     - raw (bool): True when loading raw data (fixtures). Skip side effects then.
-    - using (str): Database alias used for the operation.
-    - update_fields (set|None): Fields explicitly updated, if any.
-    - **kwargs: For forward compatibility with extra signal args.
+    - **kwargs: For forward compatibility with extra signal args (using, update_fields...).
     """
-    if raw:
-        return  # Don’t create side effects during loaddata
+    if raw or not created:
+        return
+    Profile.objects.create(user=instance)
+
 
-    # Ensure a Profile exists (covers both freshly created and existing users)
-    profile, _ = Profile.objects.get_or_create(user=instance)
+@receiver(post_save, sender=Profile)
+def queue_avatar_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    A new picture was uploaded: render its avatar sizes in the background (housing.images).
+    Saves that keep the picture (already processed, or the shared default) do no image work.
+    """
+    if raw or (update_fields is not None and "image" not in update_fields):
+        return
+    if instance.image and not instance.has_default_image and not instance.variants_ready:
+        images.queue_image(instance)
 
-    # If you need to react differently on creation, you still can:
-    if created:
-        profile.role = 'regular'
-        ...
 
-    # Save the profile to trigger any processing (e.g., image resize)
-    profile.save(using=using)
+@receiver([post_save, post_delete], sender=User)
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_cached_request_user(sender, instance, **kwargs):
+    """
+    The user or its profile changed, so the cached request.user (users.backends) is stale.
+
+    Dropped right away and once more after commit: until then, a concurrent request still reads
+    the old row and may cache it again.
+    """
+    user_id = instance.pk if sender is User else instance.user_id
+    invalidate_request_user(user_id)
+    transaction.on_commit(partial(invalidate_request_user, user_id))
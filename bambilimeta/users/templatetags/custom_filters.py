@@ -55,3 +55,11 @@ def get_any_attr(obj, attrs):
             continue
     return ""
 
+
+@register.filter
+def variant_url(image, width):
+    """
+    URL of the smallest resized copy at least width pixels wide (see housing.images), the original until there is one.
+    Usage: {{ profile|variant_url:96 }}
+    """
+    return image.variant_url(int(width))
@@ -27,3 +27,129 @@ class UserModelTest(TestCase):
         
         self.assertTrue(user.is_staff)
         self.assertTrue(user.is_superuser)
+
+
+class ProfileImageTest(TestCase):
+    def setUp(self):
+        import shutil
+        import tempfile
+        from django.test import override_settings
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='tenant', password='testpass123')
+        self.profile = self.user.profile
+
+    def upload(self):
+        import io
+        from PIL import Image
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        data = io.BytesIO()
+        Image.new('RGB', (600, 400), 'green').save(data, 'JPEG')
+        self.profile.image = SimpleUploadedFile('me.jpg', data.getvalue())
+
+    def queued(self):
+        from tasks.models import Task
+        return Task.objects.filter(name='housing.tasks.make_image_variants').count()
+
+    def test_saves_without_a_new_picture_do_no_image_work(self):
+        self.profile.bio = 'Hello'
+        self.profile.save()  # The default picture does not even exist in this MEDIA_ROOT.
+        self.assertEqual(self.queued(), 0)
+
+    def test_new_picture_is_kept_and_gets_square_avatars(self):
+        from PIL import Image
+        from housing.images import process_image
+        self.upload()
+        self.profile.save()
+        self.assertEqual(self.queued(), 1)  # Queued, not processed inline.
+        self.assertEqual(self.profile.variant_url(96), self.profile.image.url)
+
+        process_image(self.profile)
+        self.profile.refresh_from_db()
+        jpegs = [(v['width'], v['height']) for v in self.profile.variants if v['format'] == 'jpg']
+        self.assertEqual(jpegs, [(48, 48), (96, 96), (300, 300)])
+        self.assertTrue(self.profile.variant_url(96).endswith('-96.jpg'))
+        self.assertTrue(self.profile.variant_url(120).endswith('-300.jpg'))
+        with Image.open(self.profile.image.path) as original:
+            self.assertEqual(original.size, (600, 400))
+
+        self.profile.bio = 'Hello'
+        self.profile.save()
+        self.assertEqual(self.queued(), 1)
+
+
+class ProfileProvisioningTest(TestCase):
+    def test_profile_is_created_once_at_registration(self):
+        from ..models import Profile
+        user = User.objects.create_user(username='tenant', password='testpass123')
+        self.assertEqual(Profile.objects.filter(user=user).count(), 1)
+
+    def test_login_does_not_touch_the_profile(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        User.objects.create_user(username='tenant', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(self.client.login(username='tenant', password='testpass123'))
+        self.assertFalse([q['sql'] for q in queries if 'users_profile' in q['sql']])
+
+
+class RequestUserTest(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username='tenant', password='testpass123')
+
+    def test_user_and_role_come_from_one_cached_query(self):
+        from ..backends import ProfileModelBackend
+        backend = ProfileModelBackend()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).profile.role, 'regular')
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk).profile.role, 'regular')
+
+        profile = self.user.profile
+        profile.role = 'landlord'
+        profile.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).profile.role, 'landlord')
+
+    def test_user_cached_again_before_commit_is_dropped_after_it(self):
+        from django.core.cache import cache
+        from ..backends import request_user_cache_key
+        key = request_user_cache_key(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            profile = self.user.profile
+            profile.role = 'landlord'
+            profile.save()
+            cache.set(key, 'stale')  # A concurrent request that still read the old row.
+        self.assertIsNone(cache.get(key))
+
+    def test_cached_user_holds_no_password_hash(self):
+        import pickle
+        from django.core.cache import cache
+        from ..backends import ProfileModelBackend, request_user_cache_key
+        ProfileModelBackend().get_user(self.user.pk)
+        cached = cache.get(request_user_cache_key(self.user.pk))
+        self.assertIsNotNone(cached)
+        self.assertNotIn(self.user.password.encode(), pickle.dumps(cached))
+
+        user = ProfileModelBackend().get_user(self.user.pk)
+        self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+        user.first_name = 'Tenant'
+        user.save()  # Only the loaded fields, the password stays.
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('testpass123'))
+        self.assertTrue(self.client.login(username='tenant', password='testpass123'))
+
+    def test_role_checks_add_no_queries_to_a_request(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.urls import reverse
+        self.client.login(username='tenant', password='testpass123')
+        self.client.get(reverse('housing:home'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('housing:home'))
+        self.assertFalse([q['sql'] for q in queries if 'users_profile' in q['sql'] or 'auth_user' in q['sql']])
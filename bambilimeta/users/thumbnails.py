@@ -1,10 +1,48 @@
-from PIL import Image
+from PIL import Image, ImageOps
 from django.core.files.base import ContentFile
 from io import BytesIO
 
-def make_thumbnail(image_field, size=(400, 300)):
-    img = Image.open(image_field)
-    img.thumbnail(size, Image.ANTIALIAS)
+# Pillow format name -> file extension, for the variants written by housing.images.
+FORMATS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def open_upright(image_file):
+    """
+    Decode an image, rotated according to its EXIF orientation, in a mode every output format takes.
+    The returned image carries no metadata (EXIF, GPS, ICC...), so nothing of it is written back out.
+    """
+    with Image.open(image_file) as img:
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    img.info = {}  # convert() copies the metadata along.
+    return img
+
+
+def resized(img, size, crop=False):
+    """
+    A copy of img fitting in size (width, height), never upscaled, with Lanczos resampling.
+    With crop, img is cut to size's aspect ratio around its center first (e.g. square avatars).
+    """
+    if crop:
+        return ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+    copy = img.copy()
+    copy.thumbnail(size, Image.Resampling.LANCZOS)
+    return copy
+
+
+def encode(img, format="JPEG", quality=82):
+    """Encode img to bytes. JPEG has no alpha channel, transparent images are flattened on white."""
+    if format == "JPEG" and img.mode != "RGB":
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img, mask=img.getchannel("A") if "A" in img.mode else None)
+        img = background
+    options = {"optimize": True, "progressive": True} if format == "JPEG" else {"method": 4}
     temp = BytesIO()
-    img.save(temp, format='JPEG')
-    return ContentFile(temp.getvalue())
+    img.save(temp, format=format, quality=quality, **options)
+    return temp.getvalue()
+
+
+def make_thumbnail(image_field, size=(400, 300)):
+    img = resized(open_upright(image_field), size)
+    return ContentFile(encode(img, "JPEG"))
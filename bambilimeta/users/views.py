@@ -4,6 +4,7 @@ from django.contrib import messages
 from .forms import UserUpdateForm, UserRegisterForm, AdminProfileUpdateForm
 from marketplace.models import Product
 from housing.models import House, Favorite
+from housing.favorites import mark_favorites
 from .models import Profile
 from django.db.models import Prefetch, Exists, OuterRef
 from itertools import chain
@@ -264,18 +265,9 @@ class ProfileView(DetailView):
     context_object_name = "user_profile"
 
     def get_queryset(self):
-        viewer = self.request.user if self.request.user.is_authenticated else None
-
         product_qs = Product.objects.prefetch_related("images")
         house_qs = House.objects.prefetch_related("images", "reviews")
 
-        if viewer:
-            house_qs = house_qs.annotate(
-                is_favorited=Exists(
-                    Favorite.objects.filter(user_id=viewer.pk, house_id=OuterRef("pk"))
-                )
-            )
-
         return (
             Profile.objects
             .select_related("user")
@@ -330,7 +322,7 @@ class ProfileView(DetailView):
         # Portfolio items (products + houses)
         u = self.object.user
         products = list(u.products.all())
-        houses = list(u.houses.all())
+        houses = mark_favorites(list(u.houses.all()), self.request.user)  # Hearts from the viewer's cached favorite IDs
         merged = list(chain(products, houses))
         merged.sort(
             key=lambda x: getattr(x, "created_at", None)